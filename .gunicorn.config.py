@@ -11,3 +11,8 @@ workers = os.environ.get("LIVE_GUNICORN_INSTANCES", '-1')
 
 if workers == '-1':
     workers = multiprocessing.cpu_count() * 2
+
+# Threads per worker (gthread worker class). Plot rendering is thread-safe, so
+# a few workers with several threads each serve more users than extra processes
+# at a fraction of the memory.
+threads = int(os.environ.get("GUNICORN_THREADS", '1'))
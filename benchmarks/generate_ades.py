@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic ADES PSV/XML workloads.
+
+Each object is observed in a number of obsTime groups, and every group holds
+one row per photometric aperture. Positions drift linearly with aperture (the
+effect the zero-aperture fit removes) plus Gaussian noise; a fraction of the
+optional and rms values can be left blank.
+
+Usage:
+    python benchmarks/generate_ades.py out.psv [--objects 10] [--groups 20] [--apertures 5]
+                                       [--noise 0.1] [--missing 0.02] [--seed 42]
+
+The output format follows the file extension (.psv or .xml).
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+PSV_COLUMNS = [
+    "permID", "provID", "trkSub", "mode", "stn", "obsTime", "ra", "dec", "rmsRA", "rmsDec",
+    "astCat", "mag", "rmsMag", "band", "photCat", "photAp", "logSNR", "notes", "remarks",
+]
+# Columns that may be blanked by --missing
+OPTIONAL_COLUMNS = ["rmsRA", "rmsDec", "mag", "rmsMag", "logSNR", "notes", "remarks"]
+FORMATS = {
+    "ra": "{:.6f}", "dec": "{:.6f}", "rmsRA": "{:.3f}", "rmsDec": "{:.3f}",
+    "mag": "{:.1f}", "rmsMag": "{:.2f}", "photAp": "{:.1f}", "logSNR": "{:.2f}",
+}
+OBS_CONTEXT = """    <obsContext>
+      <observatory>
+        <mpcCode>{stn}</mpcCode>
+      </observatory>
+      <submitter>
+        <name>A. Generator</name>
+      </submitter>
+      <telescope>
+        <aperture>1.0</aperture>
+        <design>Reflector</design>
+        <detector>CCD</detector>
+      </telescope>
+      <measurers>
+        <name>A. Generator</name>
+      </measurers>
+    </obsContext>
+"""
+
+
+def generate_frame(
+    objects: int = 10,
+    groups: int = 20,
+    apertures: int = 5,
+    noise: float = 0.1,
+    missing: float = 0.0,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """Return a frame of text cells (already formatted) in ``PSV_COLUMNS`` order."""
+    rng = np.random.default_rng(seed)
+    n_groups = objects * groups
+    rows = n_groups * apertures
+    obj = np.repeat(np.arange(objects), groups * apertures)
+    group = np.repeat(np.arange(n_groups), apertures)
+    aperture = np.tile(np.linspace(1.5, 1.5 + 0.8 * (apertures - 1), apertures), n_groups)
+
+    # Unique obsTime per (object, group), 37 s apart
+    epoch = pd.Timestamp("2025-06-13T00:00:00Z") + pd.to_timedelta(group * 37, unit="s")
+    obs_time = epoch.strftime("%Y-%m-%dT%H:%M:%S.%f").str[:-4] + "Z"
+
+    base_ra = rng.uniform(0.0, 360.0, objects)[obj]
+    base_dec = rng.uniform(-60.0, 60.0, objects)[obj]
+    # Per-group aperture trend in arcsec per unit photAp
+    trend_ra = rng.normal(0.0, 0.05, n_groups)[group]
+    trend_dec = rng.normal(0.0, 0.05, n_groups)[group]
+    rms_ra = np.abs(rng.normal(noise, noise / 4, rows)) + 1e-3
+    rms_dec = np.abs(rng.normal(noise, noise / 4, rows)) + 1e-3
+    ra = (base_ra + (trend_ra * aperture + rng.normal(0.0, 1.0, rows) * rms_ra) / 3600.0) % 360.0
+    dec = base_dec + (trend_dec * aperture + rng.normal(0.0, 1.0, rows) * rms_dec) / 3600.0
+    mag = 18.0 - 0.4 * np.log(aperture) + rng.normal(0.0, 0.05, rows)
+
+    numeric = {
+        "ra": ra, "dec": dec, "rmsRA": rms_ra, "rmsDec": rms_dec, "mag": mag,
+        "rmsMag": np.abs(rng.normal(0.13, 0.02, rows)), "photAp": aperture,
+        "logSNR": 1.0 + 0.1 * aperture,
+    }
+    data = {name: [FORMATS[name].format(v) for v in values] for name, values in numeric.items()}
+    data.update(
+        permID=[""] * rows,
+        provID=[f"2025 A{i % 99 + 1:02d}" for i in obj],
+        trkSub=[""] * rows,
+        mode=["CCD"] * rows,
+        stn=["853"] * rows,
+        obsTime=list(obs_time),
+        astCat=["Gaia3"] * rows,
+        band=["G"] * rows,
+        photCat=["Gaia3"] * rows,
+        notes=["K"] * rows,
+        remarks=[""] * rows,
+    )
+    df = pd.DataFrame(data)[PSV_COLUMNS]
+    if missing > 0:
+        for col in OPTIONAL_COLUMNS:
+            df.loc[rng.random(rows) < missing, col] = ""
+    return df
+
+
+def write_psv(df: pd.DataFrame, path: Path) -> None:
+    widths = {col: max(len(col), int(df[col].str.len().max() or 0)) for col in df.columns}
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("# version=2017\n# observatory\n! mpcCode 853\n")
+        handle.write("|".join(col.ljust(widths[col]) for col in df.columns) + "\n")
+        for row in df.itertuples(index=False):
+            handle.write("|".join(value.ljust(widths[col]) for col, value in zip(df.columns, row)) + "\n")
+
+
+def write_xml(df: pd.DataFrame, path: Path, block_rows: int = 1000) -> None:
+    """Write ADES XML with one obsBlock (and obsContext) per ``block_rows`` observations."""
+    columns = list(df.columns)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("<?xml version='1.0' encoding='UTF-8'?>\n<ades version=\"2017\">\n")
+        for start in range(0, len(df), block_rows):
+            block = df.iloc[start : start + block_rows]
+            handle.write("  <obsBlock>\n" + OBS_CONTEXT.format(stn="853") + "    <obsData>\n")
+            for row in block.itertuples(index=False):
+                handle.write("      <optical>\n")
+                for col, value in zip(columns, row):
+                    if value:
+                        handle.write(f"        <{col}>{escape(value)}</{col}>\n")
+                handle.write("      </optical>\n")
+            handle.write("    </obsData>\n  </obsBlock>\n")
+        handle.write("</ades>\n")
+
+
+def write_ades(path: Path, **kwargs: float) -> int:
+    """Generate a workload into ``path`` (format from its extension); returns the row count."""
+    df = generate_frame(**kwargs)
+    suffix = Path(path).suffix.lower()
+    if suffix == ".psv":
+        write_psv(df, path)
+    elif suffix == ".xml":
+        write_xml(df, path)
+    else:
+        raise ValueError(f"Unsupported output extension: {suffix}")
+    return len(df)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--objects", type=int, default=10)
+    parser.add_argument("--groups", type=int, default=20, help="obsTime groups per object")
+    parser.add_argument("--apertures", type=int, default=5, help="rows (apertures) per group")
+    parser.add_argument("--noise", type=float, default=0.1, help="typical astrometric rms in arcsec")
+    parser.add_argument("--missing", type=float, default=0.0, help="fraction of optional/rms cells left blank")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rows = write_ades(
+        args.output,
+        objects=args.objects,
+        groups=args.groups,
+        apertures=args.apertures,
+        noise=args.noise,
+        missing=args.missing,
+        seed=args.seed,
+    )
+    print(f"wrote {rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Load test for concurrent plot rendering.
+
+``render`` mode renders the example fit from many threads in-process and
+checks every PNG is byte-identical to a serial render (a thread-safety check
+as much as a timing). ``http`` mode starts gunicorn with the given worker
+class/workers/threads, gives each simulated user its own session (upload,
+select a group) and then has them cycle through exclusions, requesting the
+plot after each change. The plot cache is disabled unless --plot-cache is
+given, so every request renders. Reports throughput, latency percentiles and
+per-worker RSS.
+
+Usage:
+    python benchmarks/load_test.py render [--threads 8] [--renders 64]
+    python benchmarks/load_test.py http [--worker-class gthread] [--workers 2] [--threads 8]
+                                        [--users 16] [--seconds 20] [--plot-cache]
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.cookiejar
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from startup import _children, _free_port, _rss_mb  # noqa: E402
+
+EXAMPLE = ROOT / "example_files" / "test.psv"
+
+
+def run_render(threads: int, renders: int) -> dict:
+    from src.services.file_io import _parse_file_to_dataframe
+    from src.services.plotting import fit_obstime_group, render_group_plot
+
+    df = _parse_file_to_dataframe(str(EXAMPLE), EXAMPLE.name)
+    obstime = str(df["obsTime"].iloc[0])
+    fit = fit_obstime_group(df, obstime, [str(df.index[1])], str(df.index[0]))
+    reference = render_group_plot(fit)
+
+    report = {"renders": renders, "results": []}
+    for n in sorted({1, threads}):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(n) as pool:
+            pngs = list(pool.map(lambda _: render_group_plot(fit), range(renders)))
+        elapsed = time.perf_counter() - started
+        report["results"].append(
+            {
+                "threads": n,
+                "renders_per_s": round(renders / elapsed, 1),
+                "identical": all(png == reference for png in pngs),
+            }
+        )
+    return report
+
+
+def _multipart(field: str, filename: str, payload: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class _User:
+    def __init__(self, base: str) -> None:
+        self.base = base
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, path: str, data: bytes | None = None, content_type: str | None = None) -> bytes:
+        req = urllib.request.Request(f"{self.base}{path}", data=data)
+        if content_type:
+            req.add_header("Content-Type", content_type)
+        with self.opener.open(req, timeout=60) as response:
+            return response.read()
+
+    def post_form(self, path: str, fields: dict[str, str]) -> bytes:
+        return self.request(path, urllib.parse.urlencode(fields).encode(), "application/x-www-form-urlencoded")
+
+    def setup(self) -> tuple[str, list[str]]:
+        body, content_type = _multipart("file", EXAMPLE.name, EXAMPLE.read_bytes())
+        self.request("/", body, content_type)
+        page = self.request("/").decode()
+        obstime = re.search(r'name="selected_obstime"[^>]*>\s*<option[^>]*value="([^"]+)"', page)
+        obstime = obstime.group(1) if obstime else re.search(r'<option value="([^"]+)"', page).group(1)
+        self.post_form("/select_group", {"selected_obstime": obstime})
+        row_ids = re.findall(r'name="exclude_id" value="([^"]+)"', self.request("/").decode())
+        return obstime, row_ids
+
+
+def run_http(worker_class: str, workers: int, threads: int, users: int, seconds: float, plot_cache: bool) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    target = "app:asgi_app" if worker_class.startswith("uvicorn") else "app:app"
+    cmd = [
+        sys.executable, "-m", "gunicorn", target,
+        "--worker-class", worker_class, "--workers", str(workers), "--threads", str(threads),
+        "--bind", f"127.0.0.1:{port}", "--timeout", "120",
+    ]
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    with tempfile.TemporaryDirectory() as upload_dir:
+        env = dict(os.environ, UPLOAD_FOLDER=upload_dir)
+        if not plot_cache:
+            env["PLOT_CACHE_MAX_BYTES"] = "0"
+        server = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.time() + 60
+            while True:
+                try:
+                    urllib.request.urlopen(f"{base}/about", timeout=5).read()
+                    break
+                except (urllib.error.URLError, ConnectionError):
+                    if time.time() > deadline:
+                        raise SystemExit("server did not start")
+                    time.sleep(0.05)
+
+            def simulate(user_no: int) -> None:
+                nonlocal errors
+                user = _User(base)
+                obstime, row_ids = user.setup()
+                quoted = urllib.parse.quote(obstime)
+                end = time.perf_counter() + seconds
+                step = user_no
+                while time.perf_counter() < end:
+                    # Walk through exclusion subsets so each plot is new
+                    excluded = [rid for bit, rid in enumerate(row_ids[1:]) if step >> bit & 1][:2]
+                    step += users
+                    started = time.perf_counter()
+                    try:
+                        user.request("/update_exclusions", urllib.parse.urlencode(
+                            [("obstime", obstime), ("selected_id", row_ids[0])] + [("exclude_id", r) for r in excluded]
+                        ).encode(), "application/x-www-form-urlencoded")
+                        user.request(f"/plot/{quoted}?v={step}")
+                    except Exception:
+                        with lock:
+                            errors += 1
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(users) as pool:
+                list(pool.map(simulate, range(users)))
+            elapsed = time.perf_counter() - started
+            rss = [round(_rss_mb(pid), 1) for pid in _children(server.pid)]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    lat = np.array(latencies) if latencies else np.array([np.nan])
+    return {
+        "worker_class": worker_class,
+        "workers": workers,
+        "threads": threads,
+        "users": users,
+        "plot_cache": plot_cache,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(float(np.percentile(lat, 50)) * 1000, 1),
+            "p95": round(float(np.percentile(lat, 95)) * 1000, 1),
+        },
+        "worker_rss_mb": rss,
+        "total_rss_mb": round(sum(rss), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="mode", required=True)
+    render = sub.add_parser("render")
+    render.add_argument("--threads", type=int, default=8)
+    render.add_argument("--renders", type=int, default=64)
+    web = sub.add_parser("http")
+    web.add_argument("--worker-class", default="gthread")
+    web.add_argument("--workers", type=int, default=2)
+    web.add_argument("--threads", type=int, default=8)
+    web.add_argument("--users", type=int, default=16)
+    web.add_argument("--seconds", type=float, default=20.0)
+    web.add_argument("--plot-cache", action="store_true", help="keep the plot cache enabled")
+    args = parser.parse_args()
+
+    if args.mode == "render":
+        report = run_render(args.threads, args.renders)
+    else:
+        report = run_http(args.worker_class, args.workers, args.threads, args.users, args.seconds, args.plot_cache)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Compare the single-pass C-engine PSV reader against the previous two-pass
+python-engine reader on a synthetic multi-megabyte ADES PSV file. The bare
+C-engine ``read_csv`` time is printed too, as the floor any C-engine reader
+can reach.
+
+Usage: python benchmarks/psv_reader.py [--rows N] [--repeat R]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.services.psv_reader import read_ades_psv  # noqa: E402
+
+HEADER = (
+    "permID |provID     |trkSub  |mode|stn |obsTime                |ra         |dec        "
+    "|rmsRA|rmsDec|astCat|mag  |rmsMag|band|photAp|logSNR|notes|remarks"
+)
+
+
+def _write_psv(path: Path, rows: int) -> None:
+    rng = np.random.default_rng(42)
+    apertures = np.array([1.8, 2.6, 3.3, 4.0, 4.8])
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("# version=2017\n# observatory\n! mpcCode 853\n")
+        handle.write(HEADER + "\n")
+        for i in range(rows):
+            group = i // len(apertures)
+            ra = 292.637 + rng.normal(0, 1e-5)
+            dec = -19.0388 + rng.normal(0, 1e-5)
+            handle.write(
+                f"       |C/2024 J3  |        | CCD|853 |2025-06-13T{group % 24:02d}:{group % 60:02d}:57.79Z"
+                f"|{ra:11.6f}|{dec:11.6f}|0.087|0.093 |Gaia3 |18.7 |0.14  |   G"
+                f"| {apertures[i % len(apertures)]:.1f}  |1.08  |K    |\n"
+            )
+
+
+def _legacy_read(filepath: str) -> pd.DataFrame:
+    header_idx = None
+    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
+        for i, line in enumerate(f):
+            if line.lstrip().startswith("permID"):
+                header_idx = i
+                break
+    df = pd.read_csv(filepath, sep="|", header=header_idx, engine="python")
+    df.rename(columns=lambda x: x.strip(), inplace=True)
+    for col in ("ra", "dec", "photAp"):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def _bare_read(filepath: str) -> pd.DataFrame:
+    # The C parser alone, no header search or cleanup: the floor for any C-engine reader
+    return pd.read_csv(filepath, sep="|", skiprows=3, engine="c")
+
+
+def _best_of(func, filepath: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(filepath)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.psv"
+        _write_psv(path, args.rows)
+        size_mb = os.path.getsize(path) / 1e6
+        legacy = _best_of(_legacy_read, str(path), args.repeat)
+        current = _best_of(read_ades_psv, str(path), args.repeat)
+        floor = _best_of(_bare_read, str(path), args.repeat)
+
+    print(f"rows={args.rows} size={size_mb:.1f}MB")
+    print(f"legacy two-pass python engine: {legacy * 1000:9.1f} ms")
+    print(f"single-pass C engine:          {current * 1000:9.1f} ms")
+    print(f"bare C-engine read_csv:        {floor * 1000:9.1f} ms")
+    print(f"speed-up:                      {legacy / current:9.1f}x (at most {legacy / floor:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: launch gunicorn against the app and report the time to
+the first successful response plus the resident memory of every worker, both
+right after start-up and after each requested path has been served.
+
+Usage: python benchmarks/startup.py [--workers N] [--asgi] [--path /about --path /]
+
+RSS is read from /proc, so this runs on Linux only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid: int) -> list[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r", encoding="utf-8") as handle:
+                fields = handle.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status", "r", encoding="utf-8") as handle:
+        for line in handle:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def _get(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+def _import_seconds(env: dict[str, str]) -> float:
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--asgi", action="store_true", help="use the production uvicorn worker class")
+    parser.add_argument("--path", action="append", dest="paths", help="paths to request (default: /about, /)")
+    args = parser.parse_args()
+    paths = args.paths or ["/about", "/"]
+
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    cmd = [sys.executable, "-m", "gunicorn", "--workers", str(args.workers), "--bind", f"127.0.0.1:{port}"]
+    cmd += ["--worker-class", "uvicorn.workers.UvicornWorker", "app:asgi_app"] if args.asgi else ["app:app"]
+
+    with tempfile.TemporaryDirectory() as upload_dir:
+        env = dict(os.environ, UPLOAD_FOLDER=upload_dir)
+        started = time.perf_counter()
+        server = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            first_response = None
+            while time.perf_counter() - started < 60:
+                try:
+                    _get(f"{base}{paths[0]}")
+                    first_response = time.perf_counter() - started
+                    break
+                except (urllib.error.URLError, ConnectionError):
+                    time.sleep(0.02)
+            if first_response is None:
+                raise SystemExit("server did not answer within 60s")
+            # Let the remaining workers finish booting before sampling memory
+            time.sleep(1.0)
+            workers = _children(server.pid)
+            report = {
+                "workers": len(workers),
+                "worker_class": "uvicorn" if args.asgi else "sync",
+                "import_app_s": round(_import_seconds(env), 3),
+                "time_to_first_response_s": round(first_response, 3),
+                "rss_mb_after_start": [round(_rss_mb(pid), 1) for pid in workers],
+                "after_path": {},
+            }
+            for path in paths:
+                # Enough requests that every worker sees the path at least once in practice
+                statuses = sorted({_get(f"{base}{path}") for _ in range(4 * len(workers))})
+                report["after_path"][path] = {
+                    "status": statuses,
+                    "rss_mb": [round(_rss_mb(pid), 1) for pid in workers],
+                }
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Per-stage micro-benchmarks across synthetic workload sizes.
+
+For every size and format a workload is generated with generate_ades.py and
+these stages are timed (best and median of --repeat runs):
+
+    read_cold        read_file_to_dataframe, text parse + sidecar write
+    read_sidecar     read_file_to_dataframe from the memory-mapped sidecar
+    read_cached      read_file_to_dataframe from the in-process frame cache
+    obstime_info     build_obstime_info without a path (builds the obsTime group index)
+    select_group     split_obstime_group for one group through the prebuilt index
+    fit_group        split_obstime_group + prepare_group_fit for one group
+    fit_all_groups   fit_all_groups over every group (min_rms pick rule)
+    render_plot      render_group_plot for one group
+    format_psv       format_psv_aligned of one derived row per group
+    export_xml       format_derived_xml of the same rows
+
+Results are written as JSON (with library versions and the git revision);
+pass --compare with an earlier results file to print per-stage ratios.
+
+Usage:
+    python benchmarks/suite.py [--sizes 1000,10000,100000] [--formats psv,xml] [--repeat 3]
+                               [--output results.json] [--compare baseline.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate_ades import write_ades  # noqa: E402
+
+APERTURES = 5
+GROUPS_PER_OBJECT = 20
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def _time(func: Callable[[], Any], repeat: int, setup: Callable[[], Any] | None = None) -> dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"best_s": min(timings), "median_s": statistics.median(timings)}
+
+
+def run_workload(path: Path, repeat: int) -> list[dict[str, Any]]:
+    from src.services.derived_store import format_derived_xml, format_psv_aligned
+    from src.services.file_io import build_obstime_info, read_file_to_dataframe
+    from src.services.obstime_index import build_obstime_index
+    from src.services.fitting import build_derived_rows, fit_all_groups
+    from src.services.frame_cache import frame_cache
+    from src.services.plotting import fit_obstime_group, render_group_plot
+    from src.services.selection import split_obstime_group
+    from src.services.sidecar import sidecar_path
+
+    filepath, filename = str(path), path.name
+
+    def drop_caches() -> None:
+        frame_cache.clear()
+        shutil.rmtree(sidecar_path(filepath), ignore_errors=True)
+
+    results: list[dict[str, Any]] = []
+
+    def stage(name: str, func: Callable[[], Any], setup: Callable[[], Any] | None = None) -> None:
+        try:
+            entry: dict[str, Any] = {"stage": name, **_time(func, repeat, setup)}
+        except Exception as exc:  # keep going so one broken stage does not hide the rest
+            entry = {"stage": name, "error": f"{type(exc).__name__}: {exc}"}
+        results.append(entry)
+
+    stage("read_cold", lambda: read_file_to_dataframe(filepath, filename), drop_caches)
+    read_file_to_dataframe(filepath, filename)
+    stage("read_sidecar", lambda: read_file_to_dataframe(filepath, filename), frame_cache.clear)
+    stage("read_cached", lambda: read_file_to_dataframe(filepath, filename))
+
+    df = read_file_to_dataframe(filepath, filename)
+    stage("obstime_info", lambda: build_obstime_info(df))
+    obstime = str(df["obsTime"].iloc[0])
+    picked = str(df.index[df["obsTime"].astype(str) == obstime][0])
+    groups = build_obstime_index(df)
+    stage("select_group", lambda: split_obstime_group(df, obstime, [], groups))
+    stage("fit_group", lambda: fit_obstime_group(df, obstime, [], picked))
+    stage("fit_all_groups", lambda: fit_all_groups(df, pick_rule="min_rms"))
+
+    fit = fit_obstime_group(df, obstime, [], picked)
+    if fit is not None:
+        stage("render_plot", lambda: render_group_plot(fit))
+
+    fits = fit_all_groups(df, pick_rule="min_rms")
+    columns = list(df.columns)
+    derived = pd.DataFrame(build_derived_rows(df, fits), columns=columns)
+    stage("format_psv", lambda: format_psv_aligned(derived))
+    stage("export_xml", lambda: format_derived_xml(derived))
+    for entry in results:
+        entry["derived_rows"] = len(derived)
+    return results
+
+
+def _compare(current: dict[str, Any], baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    key = lambda r: (r["format"], r["rows"], r["stage"])  # noqa: E731
+    before = {key(r): r for r in baseline["results"] if "best_s" in r}
+    print(f"\n{'format':6} {'rows':>8} {'stage':15} {'before ms':>10} {'after ms':>10} {'ratio':>7}")
+    for r in current["results"]:
+        old = before.get(key(r))
+        if old is None or "best_s" not in r:
+            continue
+        ratio = r["best_s"] / old["best_s"] if old["best_s"] else float("nan")
+        print(
+            f"{r['format']:6} {r['rows']:>8} {r['stage']:15} {old['best_s'] * 1000:>10.2f} "
+            f"{r['best_s'] * 1000:>10.2f} {ratio:>6.2f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated row counts")
+    parser.add_argument("--formats", default="psv,xml")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None, help="JSON results path")
+    parser.add_argument("--compare", type=Path, default=None, help="earlier results to compare against")
+    args = parser.parse_args()
+
+    report: dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        # Config reads the environment on import, so point it at the scratch dir first
+        os.environ["UPLOAD_FOLDER"] = tmp
+        from src import create_app
+
+        app = create_app()
+        with app.app_context():
+            for rows in (int(s) for s in args.sizes.split(",")):
+                objects = max(1, rows // (APERTURES * GROUPS_PER_OBJECT))
+                for fmt in args.formats.split(","):
+                    path = Path(tmp) / f"bench_{rows}.{fmt}"
+                    written = write_ades(path, objects=objects, groups=GROUPS_PER_OBJECT, apertures=APERTURES, missing=0.01)
+                    size_mb = path.stat().st_size / 1e6
+                    for entry in run_workload(path, args.repeat):
+                        entry = {"format": fmt, "rows": written, "size_mb": round(size_mb, 2), **entry}
+                        report["results"].append(entry)
+                        timing = f"{entry['best_s'] * 1000:10.2f} ms" if "best_s" in entry else entry["error"]
+                        print(f"{fmt:4} {written:>8} {entry['stage']:15} {timing}", flush=True)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nwrote {args.output}")
+    if args.compare:
+        _compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,32 @@ def create_app(config_class: type[Config] = Config) -> Flask:
         app.config["UPLOAD_FOLDER"] = upload_folder
     os.makedirs(upload_folder, exist_ok=True)
 
+    session_dir = app.config.get("SESSION_STORE_DIR")
+    if session_dir and not os.path.isabs(session_dir):
+        app.config["SESSION_STORE_DIR"] = str((base_dir / session_dir).resolve())
+
+    from .services.session_store import build_session_interface
+
+    session_interface = build_session_interface(app)
+    if session_interface is not None:
+        app.session_interface = session_interface
+
+    from .services.frame_cache import frame_cache
+    from .services.plot_cache import plot_cache
+
+    frame_cache.max_bytes = int(app.config["FRAME_CACHE_MAX_BYTES"])
+    plot_cache.max_bytes = int(app.config["PLOT_CACHE_MAX_BYTES"])
+    # A zero budget disables the plot cache, disk tier included
+    plot_cache.directory = os.path.join(upload_folder, "plots") if plot_cache.max_bytes > 0 else None
+
+    from .services.metrics import init_metrics
+
+    init_metrics(app)
+
+    from .services.storage import init_storage
+
+    init_storage(app)
+
     from .routes import main_bp
 
     app.register_blueprint(main_bp)
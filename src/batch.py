@@ -0,0 +1,210 @@
+"""
+Headless batch reduction of ADES files.
+
+Every input file is parsed, every obsTime group is fitted with the chosen
+pick rule and the derived zero-aperture rows are written next to each other
+in the output directory as ``<stem>_derived.psv`` and/or ``.xml`` (the
+extension joins the stem when two inputs share one), the same content the
+web UI's derived downloads produce. Files are reduced in
+parallel worker processes; no Flask app, session or upload folder is needed.
+
+Usage:
+    python -m src.batch INPUT [INPUT ...] [--out-dir derived] [--format psv,xml]
+                        [--pick-rule min_rms] [--workers N] [--recursive]
+
+Directories given as inputs are scanned for .psv/.xml files. The exit status
+is 1 when any file failed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Iterable
+
+from .config import Config
+
+FORMATS = ("psv", "xml")
+
+
+def collect_inputs(paths: Iterable[str], recursive: bool = False) -> list[Path]:
+    """Expand files and directories into a sorted, de-duplicated list of ADES files."""
+    found: dict[Path, None] = {}
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            pattern = "**/*" if recursive else "*"
+            candidates = sorted(p for p in path.glob(pattern) if p.is_file())
+        elif path.is_file():
+            candidates = [path]
+        else:
+            raise FileNotFoundError(f"No such file or directory: {raw}")
+        for candidate in candidates:
+            if candidate.suffix.lower().lstrip(".") in Config.ALLOWED_EXTENSIONS:
+                found.setdefault(candidate.resolve(), None)
+    return list(found)
+
+
+def output_stems(inputs: list[Path]) -> dict[Path, str]:
+    """Output name per input: the file stem, plus its extension when stems collide."""
+    counts: dict[str, int] = {}
+    for path in inputs:
+        counts[path.stem] = counts.get(path.stem, 0) + 1
+    stems: dict[Path, str] = {}
+    seen: dict[str, Path] = {}
+    for path in inputs:
+        stem = path.stem if counts[path.stem] == 1 else f"{path.stem}_{path.suffix.lower().lstrip('.')}"
+        if stem in seen:
+            raise ValueError(f"{seen[stem]} and {path} would write the same output name")
+        seen[stem] = path
+        stems[path] = stem
+    return stems
+
+
+def reduce_file(path: str, out_stem: str, out_dir: str, formats: tuple[str, ...], pick_rule: str) -> dict[str, Any]:
+    """Fit one ADES file and write its derived rows; runs inside a worker process."""
+    import pandas as pd
+
+    from .services.ades_writer import format_ades_xml, obs_contexts_for
+    from .services.derived_store import format_psv_aligned
+    from .services.file_io import read_file_to_dataframe
+    from .services.fitting import build_derived_rows, fit_all_groups
+
+    started = time.perf_counter()
+    source = Path(path)
+    df = read_file_to_dataframe(str(source), source.name, cache=False)
+    fits = fit_all_groups(df, pick_rule=pick_rule)
+    derived = pd.DataFrame(build_derived_rows(df, fits), columns=list(df.columns))
+
+    outputs = []
+    for fmt in formats:
+        target = Path(out_dir) / f"{out_stem}_derived.{fmt}"
+        if fmt == "psv":
+            text = format_psv_aligned(derived)
+        else:
+            text = format_ades_xml(derived, obs_contexts_for(df, fits["picked_id"].tolist()))
+        target.write_text(text, encoding="utf-8")
+        outputs.append(str(target))
+    return {
+        "path": path,
+        "bytes": source.stat().st_size,
+        "rows": len(df),
+        "groups": int(df["obsTime"].nunique()),
+        "derived": len(derived),
+        "outputs": outputs,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def _progress(done: int, total: int, line: str, stream: Any) -> None:
+    width = len(str(total))
+    stream.write(f"[{done:>{width}}/{total}] {line}\n")
+    stream.flush()
+
+
+def run_batch(
+    inputs: list[Path],
+    out_dir: Path,
+    formats: tuple[str, ...] = FORMATS,
+    pick_rule: str = "min_rms",
+    workers: int | None = None,
+    stream: Any = sys.stderr,
+) -> dict[str, Any]:
+    """Reduce ``inputs`` in a process pool, reporting each file as it finishes."""
+    stems = output_stems(inputs)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    results: list[dict[str, Any]] = []
+    failures: list[tuple[str, str]] = []
+    started = time.perf_counter()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(inputs) or 1))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(reduce_file, str(path), stems[path], str(out_dir), formats, pick_rule): path for path in inputs
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                failures.append((str(path), f"{type(exc).__name__}: {exc}"))
+                _progress(done, len(inputs), f"FAILED {path.name}: {exc}", stream)
+                continue
+            results.append(result)
+            _progress(
+                done,
+                len(inputs),
+                f"{path.name}: {result['rows']} rows, {result['derived']}/{result['groups']} groups fitted "
+                f"in {result['seconds']:.2f}s",
+                stream,
+            )
+    elapsed = time.perf_counter() - started
+
+    total_bytes = sum(r["bytes"] for r in results)
+    total_rows = sum(r["rows"] for r in results)
+    return {
+        "files": len(results),
+        "failed": failures,
+        "rows": total_rows,
+        "groups": sum(r["groups"] for r in results),
+        "derived": sum(r["derived"] for r in results),
+        "bytes": total_bytes,
+        "workers": workers,
+        "seconds": elapsed,
+        "files_per_s": len(results) / elapsed if elapsed else 0.0,
+        "rows_per_s": total_rows / elapsed if elapsed else 0.0,
+        "mb_per_s": total_bytes / 1e6 / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    from .services.fitting import PICK_RULES
+
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("inputs", nargs="+", help="ADES .psv/.xml files or directories")
+    parser.add_argument("--out-dir", type=Path, default=Path("derived"))
+    parser.add_argument("--format", default="psv,xml", help="comma-separated output formats (psv, xml)")
+    parser.add_argument(
+        "--pick-rule",
+        default="min_rms",
+        choices=[rule for rule in PICK_RULES if rule != "picked"],
+        help="row of each group whose metadata the derived row keeps",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--recursive", action="store_true", help="scan input directories recursively")
+    args = parser.parse_args(argv)
+
+    formats = tuple(f.strip() for f in args.format.split(",") if f.strip())
+    unknown = set(formats) - set(FORMATS)
+    if not formats or unknown:
+        parser.error(f"--format must be a comma-separated subset of {', '.join(FORMATS)}")
+    try:
+        inputs = collect_inputs(args.inputs, args.recursive)
+    except FileNotFoundError as exc:
+        parser.error(str(exc))
+    if not inputs:
+        parser.error("no .psv or .xml files found")
+
+    try:
+        summary = run_batch(inputs, args.out_dir, formats, args.pick_rule, args.workers)
+    except ValueError as exc:
+        parser.error(str(exc))
+    print(
+        f"{summary['files']} file(s), {summary['rows']} rows, {summary['derived']} derived rows "
+        f"in {summary['seconds']:.2f}s with {summary['workers']} worker(s): "
+        f"{summary['files_per_s']:.1f} files/s, {summary['rows_per_s']:.0f} rows/s, "
+        f"{summary['mb_per_s']:.2f} MB/s"
+    )
+    for path, error in summary["failed"]:
+        print(f"failed: {path}: {error}", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,3 +10,22 @@ class Config:
     UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", "uploads")
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {"psv", "xml"}
+    # Threads parsing the files of one multi-file upload concurrently
+    UPLOAD_PARSE_WORKERS = int(os.environ.get("UPLOAD_PARSE_WORKERS", min(8, os.cpu_count() or 1)))
+    # Per-worker budget for parsed upload frames kept in memory
+    FRAME_CACHE_MAX_BYTES = int(os.environ.get("FRAME_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    # Bytes kept under UPLOAD_FOLDER (uploads, sidecars, derived stores, spools, plots); least recently
+    # used items not held by a live session are evicted beyond it. 0 disables the quota
+    STORAGE_QUOTA_BYTES = int(os.environ.get("STORAGE_QUOTA_BYTES", 2 * 1024 * 1024 * 1024))
+    # How often each worker sweeps the upload folder (sooner after large writes)
+    STORAGE_SWEEP_SECONDS = float(os.environ.get("STORAGE_SWEEP_SECONDS", 300))
+    # Per-worker memory budget for rendered group plots (also kept under UPLOAD_FOLDER/plots)
+    PLOT_CACHE_MAX_BYTES = int(os.environ.get("PLOT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    # Where session state lives: "sqlite" or "filesystem" (server-side, cookie carries only
+    # a signed session id) or "cookie" (Flask's signed-cookie session)
+    SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "sqlite")
+    # Defaults to UPLOAD_FOLDER/sessions; must be shared by all workers
+    SESSION_STORE_DIR = os.environ.get("SESSION_STORE_DIR", "")
+    SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", 24 * 60 * 60))
+    # Prometheus text exposition at /metrics (stage timings, cache hit rates, upload sizes)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() in {"1", "true", "on", "yes"}
@@ -1,26 +1,11 @@
 from __future__ import annotations
 
-from .about import about
-from .clear_derived import clear_derived
-from .clear_exclusions import clear_exclusions
-from .clear_modifiers import clear_modifiers
-from .clear_selection import clear_selection
-from .delete_derived import delete_derived
-from .download_dataframe import download_dataframe
-from .download_derived import download_derived
-from .download_derived_xml import download_derived_xml
-from .download_selected import download_selected
-from .index import index
-from .inject_global_context import inject_global_context
-from .reset_session import reset_session
-from .select_group import select_group
-from .select_rows import select_rows
-from .select_single_entry import select_single_entry
-from .set_modifiers import set_modifiers
-from .update_exclusions import update_exclusions
+from importlib import import_module
+from typing import Any
 
 __all__ = [
     "about",
+    "auto_exclude",
     "clear_derived",
     "clear_exclusions",
     "clear_modifiers",
@@ -30,12 +15,25 @@ __all__ = [
     "download_derived",
     "download_derived_xml",
     "download_selected",
+    "fit_all_groups",
     "index",
     "inject_global_context",
+    "metrics",
+    "plot",
+    "plot_data",
+    "preview",
     "reset_session",
     "select_group",
     "select_rows",
     "select_single_entry",
     "set_modifiers",
+    "toggle_exclusion",
     "update_exclusions",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # Handlers are imported on first use so the package stays cheap to import
+    if name in __all__:
+        return getattr(import_module(f".{name}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import os
+
+from flask import flash, redirect, request, session, url_for
+
+from ..services.file_io import read_file_to_dataframe
+from ..services.fitting import SIGMA_CLIP_DEFAULT, sigma_clip_groups
+from ..services.metrics import stage_timer
+from ..services.workspace import file_state, save_file_state, workspace_files
+
+
+def auto_exclude():
+    filepath = session.get("last_file_path")
+    filename = session.get("last_filename")
+    if not filepath or not filename or not os.path.exists(filepath):
+        flash("No file loaded. Please upload a file first.", "group")
+        return redirect(url_for("main.index"))
+    try:
+        sigma = float(request.form.get("sigma") or SIGMA_CLIP_DEFAULT)
+    except ValueError:
+        flash("Sigma must be a number.", "group")
+        return redirect(url_for("main.index"))
+    if sigma <= 0:
+        flash("Sigma must be positive.", "group")
+        return redirect(url_for("main.index"))
+    try:
+        rows = groups = 0
+        # Every file of the workspace, adding to its own exclusions
+        for entry in workspace_files():
+            if not os.path.exists(entry["path"]):
+                continue
+            with stage_timer("parse"):
+                df = read_file_to_dataframe(entry["path"], entry["filename"])
+            before = file_state(entry).get("excluded_by_obstime") or {}
+            with stage_timer("fit"):
+                excluded_by_obstime = sigma_clip_groups(df, before, sigma=sigma)
+            added = [
+                len(ids) - len(before.get(key) or [])
+                for key, ids in excluded_by_obstime.items()
+                if len(ids) > len(before.get(key) or [])
+            ]
+            rows += sum(added)
+            groups += len(added)
+            save_file_state(entry, excluded_by_obstime=excluded_by_obstime)
+        session["fit_ready"] = True
+        flash(f"Sigma clipping at {sigma:g} sigma excluded {rows} row(s) in {groups} group(s).", "group")
+    except Exception as exc:
+        flash(f"Error excluding outliers: {str(exc)}", "group")
+    return redirect(url_for("main.index"))
@@ -1,17 +1,13 @@
 from __future__ import annotations
 
-import os
-
 from flask import flash, redirect, url_for
 
-from ..services.derived_store import _derived_store_path
+from ..services.derived_store import clear_derived_rows
 
 
 def clear_derived():
-    path = _derived_store_path()
     try:
-        if os.path.exists(path):
-            os.remove(path)
+        clear_derived_rows()
         flash("Cleared all derived rows.", "derived")
     except Exception as exc:
         flash(f"Error clearing derived rows: {str(exc)}", "derived")
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import os
 
-from flask import flash, make_response, redirect, session, url_for
+from flask import flash, redirect, session, url_for
 
-from ..services.file_io import read_file_to_dataframe
+from ..services.export_store import export_key, tsv_download
+from ..services.file_io import file_digest, read_file_to_dataframe
+from ..services.metrics import stage_timer
 
 
 def download_dataframe():
@@ -15,14 +17,12 @@ def download_dataframe():
         flash("No file available to download. Please upload a file first.", "global")
         return redirect(url_for("main.index"))
     try:
-        df = read_file_to_dataframe(filepath, filename)
-        txt_data = df.to_csv(sep="\t", index=False)
-        response = make_response(txt_data)
+        def load_frame():
+            with stage_timer("parse"):
+                return read_file_to_dataframe(filepath, filename)
+
         download_name = os.path.splitext(filename)[0] + ".txt"
-        response.headers["Content-Type"] = "text/plain; charset=utf-8"
-        response.headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
-        return response
+        return tsv_download(export_key(file_digest(filepath), "full"), load_frame, download_name)
     except Exception as exc:
         flash(f"Error generating download: {str(exc)}", "global")
         return redirect(url_for("main.index"))
-
@@ -1,22 +1,25 @@
 from __future__ import annotations
 
 import pandas as pd
-from flask import flash, make_response, redirect, session, url_for
+from flask import Response, flash, redirect, session, url_for
 
-from ..services.derived_store import format_psv_aligned, load_derived_rows
+from ..services.derived_store import iter_psv_aligned, load_derived_rows
+from ..services.metrics import stage_timer
 
 
 def download_derived():
-    rows = load_derived_rows()
+    with stage_timer("derived_io"):
+        rows = load_derived_rows()
     if not rows:
         flash("No derived rows to download.", "derived")
         return redirect(url_for("main.index"))
     try:
         cols = session.get("original_columns")
         df = pd.DataFrame(rows, columns=cols) if cols else pd.DataFrame(rows)
-        psv = format_psv_aligned(df)
-        response = make_response(psv)
-        response.headers["Content-Type"] = "text/plain; charset=utf-8"
+        with stage_timer("format"):
+            chunks = iter_psv_aligned(df)
+        # Streamed in blocks of rows so large exports start downloading immediately
+        response = Response(chunks, content_type="text/plain; charset=utf-8")
         response.headers["Content-Disposition"] = 'attachment; filename="derived.psv"'
         return response
     except Exception as exc:
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import os
 
-from flask import flash, make_response, redirect, session, url_for
+from flask import flash, redirect, session, url_for
 
-from ..services.file_io import read_file_to_dataframe
+from ..services.export_store import export_key, tsv_download
+from ..services.file_io import file_digest, read_file_to_dataframe
+from ..services.metrics import stage_timer
 from ..services.selection import apply_selection_modifiers
 
 
@@ -20,18 +22,19 @@ def download_selected():
         return redirect(url_for("main.index"))
 
     try:
-        df = read_file_to_dataframe(filepath, filename)
-        selected_df = df.iloc[indices]
         modifiers = session.get("selection_modifiers")
-        if modifiers:
-            selected_df = apply_selection_modifiers(selected_df, modifiers)
-        txt_data = selected_df.to_csv(sep="\t", index=False)
-        response = make_response(txt_data)
+
+        def load_frame():
+            with stage_timer("parse"):
+                df = read_file_to_dataframe(filepath, filename)
+            selected_df = df.iloc[indices]
+            if modifiers:
+                selected_df = apply_selection_modifiers(selected_df, modifiers)
+            return selected_df
+
         base = os.path.splitext(filename)[0]
-        response.headers["Content-Type"] = "text/plain; charset=utf-8"
-        response.headers["Content-Disposition"] = f'attachment; filename="{base}_selected.txt"'
-        return response
+        key = export_key(file_digest(filepath), "selected", indices, modifiers or [])
+        return tsv_download(key, load_frame, f"{base}_selected.txt")
     except Exception as exc:
         flash(f"Error generating selected download: {str(exc)}")
         return redirect(url_for("main.index"))
-
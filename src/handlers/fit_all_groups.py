@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import os
+
+from flask import flash, redirect, request, session, url_for
+
+from ..services.ades_writer import obs_contexts_for
+from ..services.derived_store import append_derived_rows
+from ..services.file_io import obstime_index, read_file_to_dataframe
+from ..services.fitting import PICK_RULES, build_derived_rows, fit_all_groups as fit_groups
+from ..services.metrics import stage_timer
+from ..services.workspace import file_state, save_file_state, workspace_files
+
+
+def fit_all_groups():
+    filepath = session.get("last_file_path")
+    filename = session.get("last_filename")
+    if not filepath or not filename or not os.path.exists(filepath):
+        flash("No file loaded. Please upload a file first.", "group")
+        return redirect(url_for("main.index"))
+    pick_rule = request.form.get("pick_rule", "picked")
+    if pick_rule not in PICK_RULES:
+        flash(f"Unknown pick rule '{pick_rule}'.", "group")
+        return redirect(url_for("main.index"))
+    try:
+        fitted = skipped = 0
+        files = [entry for entry in workspace_files() if os.path.exists(entry["path"])]
+        # Every file of the workspace, each with its own exclusions and picks
+        for entry in files:
+            path = entry["path"]
+            state = file_state(entry)
+            with stage_timer("parse"):
+                df = read_file_to_dataframe(path, entry["filename"])
+            groups = obstime_index(path, df)
+            with stage_timer("fit"):
+                fits = fit_groups(
+                    df,
+                    excluded_by_obstime=state.get("excluded_by_obstime") or {},
+                    picked_by_obstime=state.get("picked_by_obstime") or {},
+                    pick_rule=pick_rule,
+                    groups=groups,
+                )
+                new_rows = build_derived_rows(df, fits)
+            skipped += len(groups.keys) - len(new_rows)
+            if not new_rows:
+                continue
+            with stage_timer("derived_io"):
+                append_derived_rows(new_rows, obs_contexts_for(df, fits["picked_id"].tolist()))
+            prelim_all = state.get("prelim_derived_by_obstime") or {}
+            for obstime in fits["obsTime"]:
+                prelim_all.pop(str(obstime), None)
+            save_file_state(entry, prelim_derived_by_obstime=prelim_all)
+            fitted += len(new_rows)
+        if not fitted:
+            flash("No groups could be fitted. Pick an aperture per group or use the minimum-rms rule.", "group")
+            return redirect(url_for("main.index"))
+        session["fit_ready"] = True
+        message = f"Fitted {fitted} group(s) and added them to the derived entries."
+        if len(files) > 1:
+            message = f"Fitted {fitted} group(s) in {len(files)} files and added them to the derived entries."
+        if skipped > 0:
+            message += f" {skipped} group(s) skipped (no pick or fewer than two usable points)."
+        flash(message, "derived")
+    except Exception as exc:
+        flash(f"Error fitting all groups: {str(exc)}", "group")
+    return redirect(url_for("main.index"))
@@ -2,24 +2,33 @@ from __future__ import annotations
 
 import os
 import traceback
-import uuid
 from typing import Any, Optional
 
-from flask import current_app, flash, redirect, render_template, request, session
+from flask import current_app, flash, redirect, render_template, request, session, url_for
 from werkzeug.utils import secure_filename
 
-from ..services.derived_store import load_derived_rows
-from ..services.file_io import allowed_file, build_obstime_info, read_file_to_dataframe
-from ..services.plotting import generate_group_plots
-from ..services.selection import apply_selection_modifiers
+from ..services.derived_store import load_derived_entries
+from ..services.file_io import (
+    allowed_file,
+    file_digest,
+    obstime_index,
+    read_file_to_dataframe,
+    remember_digest,
+)
+from ..services.metrics import stage_timer, upload_bytes
+from ..services.plot_cache import plot_etag
+from ..services.plotting import prepare_group_fit, stage_group_fit
+from ..services.selection import find_output_row, split_obstime_group
+from ..services.upload_store import release_upload, store_upload
+from ..services.workspace import parse_uploads, replace_workspace, workspace_files, workspace_paths
 
 
 def index():
     file_content = None
     plot_urls = None
-    selected_df_html = None
-    selected_rows: Optional[list[dict[str, Any]]] = None
-    selected_columns = None
+    show_fit_card = False
+    group_preview: Optional[dict[str, Any]] = None
+    selection_preview: Optional[dict[str, str]] = None
     modifiers_summary = None
     error = None
     available_obstimes = None
@@ -30,7 +39,10 @@ def index():
     picked_id = picked_by_obstime.get(str(selected_obstime)) if selected_obstime else None
     selected_count_value = None
     fit_summary = None
-    derived_rows = load_derived_rows()
+    with stage_timer("derived_io"):
+        derived_entries = load_derived_entries()
+    derived_ids = [row_id for row_id, _ in derived_entries]
+    derived_rows = [row for _, row in derived_entries]
     derived_columns = list(derived_rows[0].keys()) if derived_rows else None
     original_columns = session.get("original_columns")
     fit_ready = session.get("fit_ready")
@@ -40,102 +52,116 @@ def index():
             flash("No file part in the request", "global")
             return redirect(request.url)
 
-        file = request.files["file"]
-        if file.filename == "":
+        files = [f for f in request.files.getlist("file") if f and f.filename]
+        if not files:
             flash("No file selected", "global")
             return redirect(request.url)
 
-        if file and allowed_file(file.filename):
+        allowed = ", ".join(current_app.config.get("ALLOWED_EXTENSIONS", []))
+        stored: dict[str, str] = {}
+        for file in files:
+            if not allowed_file(file.filename):
+                flash(f"{file.filename}: file type not allowed. Allowed types are: {allowed}", "global")
+                continue
             try:
-                # safe original filename
-                orig_name = secure_filename(file.filename)
-                name, ext = os.path.splitext(orig_name)
-                # generate unique filename to avoid collisions
-                unique_name = f"{name}_{uuid.uuid4().hex}{ext}"
-
-                upload_folder = current_app.config["UPLOAD_FOLDER"]
-                # ensure upload folder exists
-                os.makedirs(upload_folder, exist_ok=True)
-
-                filepath = os.path.join(upload_folder, unique_name)
-                file.save(filepath)
-                # store paths/names: show original name in UI, keep saved unique name internally
-                session["last_file_path"] = filepath
-                session["last_filename"] = orig_name
-                session["saved_filename"] = unique_name
-                current_filename = orig_name
-
-                session.pop("selected_indices", None)
-                session.pop("selected_obstime", None)
-                session["fit_ready"] = False
-
-                df = read_file_to_dataframe(filepath, orig_name)
-                available_obstimes, obstime_counts = build_obstime_info(df)
-                session["available_obstimes"] = available_obstimes
-                session["obstime_counts"] = obstime_counts
-                session["original_columns"] = [c for c in df.columns if c != "_row_id"]
+                # content-addressed: identical uploads share one stored file and its parse products
+                ext = file.filename.rsplit(".", 1)[1].lower()
+                with stage_timer("upload"):
+                    filepath, digest = store_upload(file.stream, ext)
+                remember_digest(filepath, digest)
+                upload_bytes.observe(os.path.getsize(filepath))
+                # show the original name in the UI, keep the stored object name internally
+                stored.setdefault(filepath, secure_filename(file.filename))
             except Exception as exc:
-                error = f"Error processing file: {str(exc)}"
                 current_app.logger.error(traceback.format_exc())
+                flash(f"Error storing file {file.filename}: {str(exc)}", "global")
+
+        with stage_timer("parse"):
+            parsed = parse_uploads(list(stored.items()), current_app.config["UPLOAD_PARSE_WORKERS"])
+        loaded = []
+        for entry in parsed:
+            if "error" in entry:
+                error = f"Error processing file {entry['filename']}: {entry['error']}"
+                current_app.logger.error(error)
                 flash(error, "global")
-        else:
-            allowed = ", ".join(current_app.config.get("ALLOWED_EXTENSIONS", []))
-            flash(f"File type not allowed. Allowed types are: {allowed}", "global")
+                if entry["path"] not in workspace_paths():
+                    release_upload(entry["path"])
+            else:
+                loaded.append(entry)
+        if loaded:
+            for path in replace_workspace(loaded):
+                release_upload(path)
+            session.pop("selected_indices", None)
+            session.pop("selected_obstime", None)
+            session["fit_ready"] = False
+            selected_obstime = picked_id = None
+            current_filename = session.get("last_filename")
+            available_obstimes = session.get("available_obstimes")
+            obstime_counts = session.get("obstime_counts")
+            if len(loaded) > 1:
+                rows = sum(entry["rows"] for entry in loaded)
+                n_groups = sum(len(entry["available_obstimes"]) for entry in loaded)
+                flash(f"Loaded {len(loaded)} files: {rows} rows in {n_groups} obsTime groups.", "global")
 
     last_path = session.get("last_file_path")
     last_name = session.get("last_filename")
     group_excluded: set[str] = set()
     if request.method == "GET" and last_path and last_name and os.path.exists(last_path):
         try:
-            df = read_file_to_dataframe(last_path, last_name)
-            available_obstimes, obstime_counts = build_obstime_info(df)
+            with stage_timer("parse"):
+                df = read_file_to_dataframe(last_path, last_name)
+            with stage_timer("filter"):
+                groups = obstime_index(last_path, df)
+            available_obstimes, obstime_counts = list(groups.keys), dict(groups.counts)
             session["available_obstimes"] = available_obstimes
             session["obstime_counts"] = obstime_counts
             original_columns = [c for c in df.columns if c != "_row_id"]
             session["original_columns"] = original_columns
             if selected_obstime is not None:
-                selected_mask = df["obsTime"].astype(str) == str(selected_obstime)
-                selected_df = df[selected_mask].copy()
-                selected_df["_row_id"] = selected_df.index.astype(str)
                 excluded_by_obstime = session.get("excluded_by_obstime") or {}
                 group_excluded = set((excluded_by_obstime.get(str(selected_obstime)) or []))
-                preview_df = selected_df.head(50)
-                selected_columns = [c for c in preview_df.columns if c != "_row_id"]
-                selected_rows = [
-                    {"_row_id": str(row["_row_id"]), **{col: row[col] for col in selected_columns}}
-                    for _, row in preview_df.iterrows()
-                ]
-                try:
-                    selected_df_html = preview_df.drop(columns=["_row_id"]).to_html(
-                        classes="table table-striped table-bordered table-hover", index=False
+                with stage_timer("filter"):
+                    selected_df, selected_df_filtered = split_obstime_group(
+                        df, selected_obstime, group_excluded, groups
                     )
-                except Exception:
-                    selected_df_html = None
-                selected_df_filtered = selected_df[~selected_df["_row_id"].isin(group_excluded)].copy()
+                if not selected_df.empty:
+                    # Rows are paged in by the table from /preview
+                    group_preview = {
+                        "url": url_for("main.preview", obstime=str(selected_obstime)),
+                        "columns": original_columns,
+                        "total": len(selected_df),
+                    }
+                    show_fit_card = True
                 if not selected_df_filtered.empty:
                     selected_count_value = len(selected_df_filtered)
-                    output_row_series = None
-                    if picked_id:
-                        sel_row = selected_df_filtered[selected_df_filtered["_row_id"] == str(picked_id)]
-                        if sel_row.empty:
-                            sel_row = selected_df[selected_df["_row_id"] == str(picked_id)]
-                        if not sel_row.empty:
-                            output_row_series = sel_row.iloc[0]
+                    output_row_series = find_output_row(selected_df, selected_df_filtered, picked_id)
                     if output_row_series is not None:
-                        plot_urls = generate_group_plots(
-                            selected_df_filtered, output_row=output_row_series, full_group=selected_df
-                        )
+                        with stage_timer("fit"):
+                            fit = prepare_group_fit(
+                                selected_df_filtered, output_row=output_row_series, full_group=selected_df
+                            )
+                        if fit is not None:
+                            stage_group_fit(fit)
+                            etag = plot_etag(
+                                file_digest(last_path), str(selected_obstime), group_excluded, fit["picked_id"]
+                            )
+                            plot_urls = {
+                                "coords_photAp": url_for("main.plot", obstime=str(selected_obstime), v=etag)
+                            }
                 else:
                     plot_urls = None
-                    selected_df_html = None
+                    show_fit_card = False
                     flash("Selected obstime has no matching rows in the current file.", "plot")
             selected_indices = session.get("selected_indices")
             if selected_indices:
                 try:
-                    selected_df = df.iloc[selected_indices]
+                    selection_preview = {
+                        "url": url_for("main.preview", scope="selection"),
+                        "columns": original_columns,
+                    }
+                    show_fit_card = True
                     modifiers = session.get("selection_modifiers")
                     if modifiers:
-                        selected_df = apply_selection_modifiers(selected_df, modifiers)
                         parts = []
                         for modifier in modifiers:
                             m_type = (modifier or {}).get("type")
@@ -146,33 +172,34 @@ def index():
                             else:
                                 parts.append(m_type or "unknown")
                         modifiers_summary = ", ".join(parts) if parts else None
-                    selected_df_html = selected_df.head(50).to_html(
-                        classes="table table-striped table-bordered table-hover", index=False
-                    )
                 except Exception:
-                    selected_df_html = None
+                    selection_preview = None
         except Exception:
             pass
 
-    return render_template(
-        "index.html",
-        file_content=file_content,
-        plot_urls=plot_urls,
-        selected_df_html=selected_df_html,
-        selected_rows=selected_rows,
-        selected_columns=selected_columns,
-        excluded_ids=list(group_excluded),
-        picked_id=picked_id,
-        fit_summary=fit_summary,
-        derived_rows=derived_rows,
-        derived_columns=derived_columns,
-        original_columns=original_columns,
-        current_filename=current_filename,
-        modifiers_summary=modifiers_summary,
-        error=error,
-        available_obstimes=available_obstimes,
-        selected_obstime=selected_obstime,
-        obstime_counts=obstime_counts,
-        selected_count=selected_count_value,
-        fit_ready=fit_ready,
-    )
+    with stage_timer("template"):
+        return render_template(
+            "index.html",
+            file_content=file_content,
+            plot_urls=plot_urls,
+            show_fit_card=show_fit_card,
+            group_preview=group_preview,
+            selection_preview=selection_preview,
+            excluded_ids=list(group_excluded),
+            picked_id=picked_id,
+            fit_summary=fit_summary,
+            derived_rows=derived_rows,
+            derived_ids=derived_ids,
+            derived_columns=derived_columns,
+            original_columns=original_columns,
+            current_filename=current_filename,
+            modifiers_summary=modifiers_summary,
+            error=error,
+            available_obstimes=available_obstimes,
+            selected_obstime=selected_obstime,
+            obstime_counts=obstime_counts,
+            selected_count=selected_count_value,
+            fit_ready=fit_ready,
+            workspace=workspace_files(),
+            active_file_key=os.path.basename(session.get("last_file_path") or ""),
+        )
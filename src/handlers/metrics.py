@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from flask import abort, current_app, make_response
+
+from ..services.metrics import registry
+
+
+def metrics():
+    if not current_app.config.get("METRICS_ENABLED", True):
+        abort(404)
+    response = make_response(registry.render())
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    response.headers["Cache-Control"] = "no-store"
+    return response
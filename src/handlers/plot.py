@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import os
+
+from flask import abort, make_response, request, session
+
+from ..services.file_io import file_digest, obstime_index, read_file_to_dataframe
+from ..services.metrics import stage_timer
+from ..services.plot_cache import plot_cache, plot_etag
+from ..services.plotting import fit_obstime_group, render_group_plot
+
+
+def plot(obstime: str):
+    filepath = session.get("last_file_path")
+    filename = session.get("last_filename")
+    if not filepath or not filename or not os.path.exists(filepath):
+        abort(404)
+    excluded = (session.get("excluded_by_obstime") or {}).get(str(obstime)) or []
+    picked_id = (session.get("picked_by_obstime") or {}).get(str(obstime))
+    etag = plot_etag(file_digest(filepath), obstime, excluded, picked_id)
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+        response.set_etag(etag)
+        return response
+
+    png = plot_cache.get(etag)
+    if png is None:
+        with stage_timer("parse"):
+            df = read_file_to_dataframe(filepath, filename)
+        with stage_timer("fit"):
+            fit = fit_obstime_group(df, obstime, excluded, picked_id, obstime_index(filepath, df))
+        if fit is None:
+            abort(404)
+        with stage_timer("render"):
+            png = render_group_plot(fit)
+        plot_cache.put(etag, png)
+
+    response = make_response(png)
+    response.headers["Content-Type"] = "image/png"
+    response.headers["Cache-Control"] = "private, max-age=3600"
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import os
+
+import numpy as np
+from flask import abort, jsonify, request, session
+
+from ..services.file_io import obstime_index, read_file_to_dataframe
+from ..services.frame_cache import file_cache_key
+from ..services.metrics import stage_timer
+from ..services.preview import PREVIEW_PAGE_SIZE, preview_page
+from ..services.selection import apply_selection_modifiers
+
+
+def preview():
+    filepath = session.get("last_file_path")
+    filename = session.get("last_filename")
+    if not filepath or not filename or not os.path.exists(filepath):
+        abort(404)
+    try:
+        offset = int(request.args.get("offset", 0))
+        limit = int(request.args.get("limit", PREVIEW_PAGE_SIZE))
+    except ValueError:
+        return jsonify(error="offset and limit must be integers"), 400
+    order = request.args.get("order", "asc")
+    if order not in ("asc", "desc"):
+        return jsonify(error="order must be 'asc' or 'desc'"), 400
+    columns = [c for c in request.args.get("columns", "").split(",") if c]
+    obstime = request.args.get("obstime")
+    scope = request.args.get("scope", "group" if obstime else "file")
+
+    with stage_timer("parse"):
+        df = read_file_to_dataframe(filepath, filename)
+    with stage_timer("filter"):
+        positions = None
+        if scope == "group":
+            if obstime is None:
+                return jsonify(error="obstime is required for the group scope"), 400
+            positions = obstime_index(filepath, df).positions(obstime)
+        elif scope == "selection":
+            indices = [i for i in session.get("selected_indices") or [] if i < len(df)]
+            positions = np.asarray(indices, dtype=np.int64)
+            modifiers = session.get("selection_modifiers")
+            if modifiers:
+                selected = apply_selection_modifiers(df.iloc[indices], modifiers)
+                positions = df.index.get_indexer(selected.index)
+        elif scope != "file":
+            return jsonify(error=f"Unknown scope '{scope}'"), 400
+        try:
+            page = preview_page(
+                df,
+                positions,
+                columns=columns,
+                sort=request.args.get("sort") or None,
+                ascending=order == "asc",
+                offset=offset,
+                limit=limit,
+                cache_key=file_cache_key(filepath),
+            )
+        except KeyError as exc:
+            return jsonify(error=str(exc.args[0])), 400
+        except TypeError as exc:
+            return jsonify(error=f"Cannot sort: {exc}"), 400
+    response = jsonify(page)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -2,9 +2,13 @@ from __future__ import annotations
 
 from flask import flash, redirect, session, url_for
 
+from ..services.upload_store import release_upload
+from ..services.workspace import workspace_paths
+
 
 def reset_session():
+    for path in workspace_paths() | {session.get("last_file_path")}:
+        release_upload(path)
     session.clear()
     flash("Session reset. Start by uploading a new file.", "global")
     return redirect(url_for("main.index"))
-
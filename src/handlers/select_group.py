@@ -4,14 +4,24 @@ import os
 
 from flask import flash, redirect, request, session, url_for
 
+from ..services.workspace import activate_file
+
 
 def select_group():
+    value = request.form.get("selected_obstime")
+    # Workspace groups are posted as "<file key>|<obsTime>"
+    group = request.form.get("selected_group")
+    if group:
+        key, _, value = group.partition("|")
+        entry = activate_file(key)
+        if entry is None:
+            flash("That file is no longer loaded. Please upload it again.", "group")
+            return redirect(url_for("main.index"))
     filepath = session.get("last_file_path")
     filename = session.get("last_filename")
     if not filepath or not filename or not os.path.exists(filepath):
         flash("No file loaded. Please upload a file first.", "group")
         return redirect(url_for("main.index"))
-    value = request.form.get("selected_obstime")
     if value is None or value == "":
         session.pop("selected_obstime", None)
         session["fit_ready"] = False
@@ -19,5 +29,8 @@ def select_group():
     else:
         session["selected_obstime"] = value
         session["fit_ready"] = False
-        flash(f"Selected group obstime = {value}", "group")
+        if group and len(session.get("workspace_files") or []) > 1:
+            flash(f"Selected group obstime = {value} in {filename}", "group")
+        else:
+            flash(f"Selected group obstime = {value}", "group")
     return redirect(url_for("main.index"))
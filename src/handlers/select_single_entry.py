@@ -4,7 +4,10 @@ import os
 
 from flask import flash, redirect, session, url_for
 
-from ..services.derived_store import load_derived_rows, save_derived_rows
+from ..services.ades_writer import obs_contexts_for
+from ..services.derived_store import append_derived_rows
+from ..services.file_io import read_file_to_dataframe
+from ..services.metrics import stage_timer
 
 
 def select_single_entry():
@@ -22,9 +25,11 @@ def select_single_entry():
                 "derived",
             )
             return redirect(url_for("main.index"))
-        derived_rows = load_derived_rows()
-        derived_rows.append(prelim)
-        save_derived_rows(derived_rows)
+        picked_id = (session.get("picked_by_obstime") or {}).get(str(obstime))
+        with stage_timer("parse"):
+            df = read_file_to_dataframe(filepath, filename)
+        with stage_timer("derived_io"):
+            append_derived_rows([prelim], obs_contexts_for(df, [picked_id]))
         prelim_all = session.get("prelim_derived_by_obstime") or {}
         prelim_all.pop(str(obstime), None)
         session["prelim_derived_by_obstime"] = prelim_all
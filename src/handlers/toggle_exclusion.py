@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+
+from flask import abort, jsonify, request, session, url_for
+
+from ..services.file_io import file_digest, obstime_index, read_file_to_dataframe
+from ..services.frame_cache import file_cache_key
+from ..services.group_stats import group_stats
+from ..services.metrics import stage_timer
+from ..services.plot_cache import plot_etag
+
+
+def toggle_exclusion():
+    filepath = session.get("last_file_path")
+    filename = session.get("last_filename")
+    if not filepath or not filename or not os.path.exists(filepath):
+        abort(404)
+    obstime = request.form.get("obstime")
+    if not obstime:
+        return jsonify(error="obstime is required"), 400
+    # The client sends the group's whole exclusion set, so the last request wins
+    # rather than two toggles racing on the stored set
+    excluded = list(dict.fromkeys(request.form.getlist("excluded_ids")))
+
+    def load_group():
+        with stage_timer("parse"):
+            df = read_file_to_dataframe(filepath, filename)
+        return df.iloc[obstime_index(filepath, df).positions(obstime)]
+
+    with stage_timer("fit"):
+        stats = group_stats(file_cache_key(filepath), obstime, load_group)
+        unknown = [row_id for row_id in excluded if row_id not in stats.slot]
+        if unknown:
+            return jsonify(error=f"Row {unknown[0]} is not in obstime group {obstime}"), 400
+        picked_id = (session.get("picked_by_obstime") or {}).get(str(obstime))
+        fit = stats.fit(excluded, picked_id)
+
+    excluded_by_obstime = session.get("excluded_by_obstime") or {}
+    excluded_by_obstime[str(obstime)] = excluded
+    session["excluded_by_obstime"] = excluded_by_obstime
+    session["fit_ready"] = True
+    # Keep the staged entry in step with the fit the user now sees
+    prelim_all = session.get("prelim_derived_by_obstime") or {}
+    prelim = prelim_all.get(str(obstime))
+    if prelim is not None:
+        if fit is not None and fit["ra0"] is not None:
+            prelim.update(ra=fit["ra0"], dec=fit["dec0"], rmsRA=fit["ra0_err"], rmsDec=fit["dec0_err"])
+        else:
+            prelim_all.pop(str(obstime), None)
+        session["prelim_derived_by_obstime"] = prelim_all
+
+    etag = plot_etag(file_digest(filepath), str(obstime), excluded, picked_id)
+    response = jsonify(
+        obsTime=str(obstime),
+        excluded_ids=excluded,
+        fit=fit,
+        plot_url=url_for("main.plot", obstime=str(obstime), v=etag),
+    )
+    response.headers["Cache-Control"] = "no-store"
+    return response
@@ -1,45 +1,60 @@
 from __future__ import annotations
 
+from typing import Any, Callable
+
 from flask import Blueprint
+from werkzeug.utils import cached_property, import_string
+
+from .handlers.inject_global_context import inject_global_context
+
+
+class LazyView:
+    """View that imports its handler module on first request.
+
+    Handlers pull in pandas, numpy and matplotlib; deferring the import keeps
+    worker start-up cheap and lets a worker that never plots skip matplotlib.
+    """
+
+    def __init__(self, import_name: str) -> None:
+        self.__module__, self.__name__ = import_name.rsplit(".", 1)
+        self.import_name = import_name
+
+    @cached_property
+    def view(self) -> Callable[..., Any]:
+        return import_string(self.import_name)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.view(*args, **kwargs)
+
+
+def _lazy(name: str) -> LazyView:
+    return LazyView(f"{__package__}.handlers.{name}.{name}")
 
-from .handlers import (
-    about,
-    clear_derived,
-    clear_exclusions,
-    clear_modifiers,
-    clear_selection,
-    delete_derived,
-    download_dataframe,
-    download_derived,
-    download_derived_xml,
-    download_selected,
-    index,
-    inject_global_context,
-    select_group,
-    select_rows,
-    select_single_entry,
-    set_modifiers,
-    reset_session,
-    update_exclusions,
-)
 
 main_bp = Blueprint("main", __name__)
 main_bp.app_context_processor(inject_global_context)
 
-main_bp.add_url_rule("/", view_func=index, methods=["GET", "POST"])
-main_bp.add_url_rule("/about", view_func=about, methods=["GET"])
-main_bp.add_url_rule("/download", view_func=download_dataframe, methods=["GET"])
-main_bp.add_url_rule("/update_exclusions", view_func=update_exclusions, methods=["POST"])
-main_bp.add_url_rule("/clear_exclusions", view_func=clear_exclusions, methods=["POST"])
-main_bp.add_url_rule("/select_rows", view_func=select_rows, methods=["POST"])
-main_bp.add_url_rule("/clear_selection", view_func=clear_selection, methods=["POST"])
-main_bp.add_url_rule("/select_group", view_func=select_group, methods=["POST"])
-main_bp.add_url_rule("/download_selected", view_func=download_selected, methods=["GET"])
-main_bp.add_url_rule("/set_modifiers", view_func=set_modifiers, methods=["POST"])
-main_bp.add_url_rule("/clear_modifiers", view_func=clear_modifiers, methods=["POST"])
-main_bp.add_url_rule("/reset", view_func=reset_session, methods=["POST"])
-main_bp.add_url_rule("/select_single_entry", view_func=select_single_entry, methods=["POST"])
-main_bp.add_url_rule("/delete_derived", view_func=delete_derived, methods=["POST"])
-main_bp.add_url_rule("/clear_derived", view_func=clear_derived, methods=["POST"])
-main_bp.add_url_rule("/download_derived", view_func=download_derived, methods=["GET"])
-main_bp.add_url_rule("/download_derived_xml", view_func=download_derived_xml, methods=["GET"])
+main_bp.add_url_rule("/", view_func=_lazy("index"), methods=["GET", "POST"])
+main_bp.add_url_rule("/about", view_func=_lazy("about"), methods=["GET"])
+main_bp.add_url_rule("/metrics", view_func=_lazy("metrics"), methods=["GET"])
+main_bp.add_url_rule("/plot/<path:obstime>", view_func=_lazy("plot"), methods=["GET"])
+main_bp.add_url_rule("/plot_data/<path:obstime>", view_func=_lazy("plot_data"), methods=["GET"])
+main_bp.add_url_rule("/preview", view_func=_lazy("preview"), methods=["GET"])
+main_bp.add_url_rule("/download", view_func=_lazy("download_dataframe"), methods=["GET"])
+main_bp.add_url_rule("/update_exclusions", view_func=_lazy("update_exclusions"), methods=["POST"])
+main_bp.add_url_rule("/auto_exclude", view_func=_lazy("auto_exclude"), methods=["POST"])
+main_bp.add_url_rule("/toggle_exclusion", view_func=_lazy("toggle_exclusion"), methods=["POST"])
+main_bp.add_url_rule("/clear_exclusions", view_func=_lazy("clear_exclusions"), methods=["POST"])
+main_bp.add_url_rule("/select_rows", view_func=_lazy("select_rows"), methods=["POST"])
+main_bp.add_url_rule("/clear_selection", view_func=_lazy("clear_selection"), methods=["POST"])
+main_bp.add_url_rule("/select_group", view_func=_lazy("select_group"), methods=["POST"])
+main_bp.add_url_rule("/fit_all_groups", view_func=_lazy("fit_all_groups"), methods=["POST"])
+main_bp.add_url_rule("/download_selected", view_func=_lazy("download_selected"), methods=["GET"])
+main_bp.add_url_rule("/set_modifiers", view_func=_lazy("set_modifiers"), methods=["POST"])
+main_bp.add_url_rule("/clear_modifiers", view_func=_lazy("clear_modifiers"), methods=["POST"])
+main_bp.add_url_rule("/reset", view_func=_lazy("reset_session"), methods=["POST"])
+main_bp.add_url_rule("/select_single_entry", view_func=_lazy("select_single_entry"), methods=["POST"])
+main_bp.add_url_rule("/delete_derived", view_func=_lazy("delete_derived"), methods=["POST"])
+main_bp.add_url_rule("/clear_derived", view_func=_lazy("clear_derived"), methods=["POST"])
+main_bp.add_url_rule("/download_derived", view_func=_lazy("download_derived"), methods=["GET"])
+main_bp.add_url_rule("/download_derived_xml", view_func=_lazy("download_derived_xml"), methods=["GET"])
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+ADES_VERSION = "2017"
+INDENT = "  "
+# Observations written between flushes of the output buffer
+XML_CHUNK_ROWS = 512
+
+
+class _Sink:
+    """File-like target for ``etree.xmlfile`` that hands written bytes back out."""
+
+    def __init__(self) -> None:
+        self.parts: list[bytes] = []
+
+    def write(self, data: bytes) -> None:
+        self.parts.append(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _cell_text(df: pd.DataFrame) -> list[list[str]]:
+    """Stripped text of every cell, column-major; missing values are empty strings."""
+    columns = []
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        text = col.astype(str).where(col.notna(), "")
+        columns.append(text.str.strip().tolist())
+    return columns
+
+
+def _record(tag: str, names: Sequence[str], values: Sequence[str], level: int) -> etree._Element:
+    """One observation element, pre-indented for nesting depth ``level``."""
+    elem = etree.Element(tag)
+    inner = "\n" + INDENT * (level + 1)
+    child = None
+    for name, value in zip(names, values):
+        if value:
+            child = etree.SubElement(elem, name)
+            child.text = value
+            child.tail = inner
+    if child is not None:
+        elem.text = inner
+        child.tail = "\n" + INDENT * level
+    return elem
+
+
+def _context_element(obs_context: str, level: int) -> etree._Element:
+    parser = etree.XMLParser(remove_blank_text=True, resolve_entities=False, no_network=True)
+    elem = etree.fromstring(obs_context, parser)
+    etree.indent(elem, space=INDENT, level=level)
+    return elem
+
+
+def iter_ades_xml(
+    df: pd.DataFrame,
+    obs_contexts: Optional[Sequence[Optional[str]]] = None,
+    version: str = ADES_VERSION,
+    record_tag: str = "optical",
+    chunk_rows: int = XML_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """Yield an indented ADES document for ``df`` with ``lxml.etree.xmlfile``.
+
+    Consecutive rows sharing an ``obs_contexts`` entry (serialized
+    ``obsContext`` XML, or None) are written as one ``obsBlock``. Empty cells
+    are omitted rather than written as empty elements. Cells are converted
+    to text and written ``chunk_rows`` observations at a time, so only one
+    chunk is ever held as strings or bytes. Column names that are not valid
+    XML tags raise ValueError here, before anything is streamed.
+    """
+    names = [str(col) for col in df.columns]
+    for name in names:
+        try:
+            etree.Element(name)
+        except ValueError:
+            raise ValueError(f"Column name {name!r} is not a valid XML element name") from None
+    contexts = list(obs_contexts) if obs_contexts is not None else [None] * len(df)
+    if len(contexts) != len(df):
+        raise ValueError("obs_contexts must have one entry per row")
+
+    def chunks() -> Iterator[bytes]:
+        sink = _Sink()
+        cells: list[list[str]] = []
+        cells_start = -1
+        with etree.xmlfile(sink, encoding="UTF-8", buffered=False) as xf:
+            xf.write_declaration()
+            with xf.element("ades", version=version):
+                start = 0
+                while start < len(df):
+                    context = contexts[start]
+                    stop = start + 1
+                    while stop < len(df) and contexts[stop] == context:
+                        stop += 1
+                    xf.write("\n" + INDENT)
+                    with xf.element("obsBlock"):
+                        if context:
+                            xf.write("\n" + INDENT * 2)
+                            xf.write(_context_element(context, 2))
+                        xf.write("\n" + INDENT * 2)
+                        with xf.element("obsData"):
+                            for row in range(start, stop):
+                                if row - row % chunk_rows != cells_start:
+                                    cells_start = row - row % chunk_rows
+                                    cells = _cell_text(df.iloc[cells_start : cells_start + chunk_rows])
+                                offset = row - cells_start
+                                xf.write("\n" + INDENT * 3)
+                                xf.write(_record(record_tag, names, [col[offset] for col in cells], 3))
+                                if (row + 1) % chunk_rows == 0:
+                                    yield sink.drain()
+                            xf.write("\n" + INDENT * 2)
+                        xf.write("\n" + INDENT)
+                    start = stop
+                xf.write("\n")
+        sink.write(b"\n")
+        yield sink.drain()
+
+    return chunks()
+
+
+def format_ades_xml(
+    df: pd.DataFrame, obs_contexts: Optional[Sequence[Optional[str]]] = None, version: str = ADES_VERSION
+) -> str:
+    return b"".join(iter_ades_xml(df, obs_contexts, version)).decode("utf-8")
+
+
+def obs_contexts_for(df: pd.DataFrame, row_ids: Sequence[Optional[str]]) -> list[Optional[str]]:
+    """The ``obsContext`` of the ``obsBlock`` each row (by ``_row_id``) was read from.
+
+    Uses ``df.attrs["obs_blocks"]`` from the XML reader; rows of PSV uploads,
+    or ids that are not row labels, map to None.
+    """
+    blocks = [b for b in df.attrs.get("obs_blocks") or [] if b.get("obs_context")]
+    if not blocks:
+        return [None] * len(row_ids)
+    starts = np.array([b["start"] for b in blocks])
+    out: list[Optional[str]] = []
+    for row_id in row_ids:
+        try:
+            label = int(row_id)
+        except (TypeError, ValueError):
+            out.append(None)
+            continue
+        pos = int(np.searchsorted(starts, label, side="right")) - 1
+        inside = pos >= 0 and label < blocks[pos]["stop"]
+        out.append(blocks[pos]["obs_context"] if inside else None)
+    return out
@@ -1,14 +1,34 @@
 from __future__ import annotations
 
+import fcntl
 import json
 import os
+import tempfile
+import threading
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, List
+from typing import Any, Iterable, Iterator, List, Optional
 
 import pandas as pd
 from flask import current_app, session
 
+from .ades_writer import format_ades_xml
+
+
+# Compact the log once it holds this many tombstones and they outnumber live rows
+COMPACT_MIN_TOMBSTONES = 32
+READ_CACHE_ENTRIES = 64
+# Rows per block when streaming aligned PSV
+PSV_CHUNK_ROWS = 2048
+
+# A log's live (id, row) entries, tombstone count and obsContext per row id
+_Replay = tuple[list[tuple[str, dict[str, Any]]], int, dict[str, str]]
+# Parsed logs keyed by path, valid while (inode, size, mtime_ns) is unchanged
+_read_cache: OrderedDict[str, tuple[tuple[int, int, int], _Replay]] = OrderedDict()
+_read_cache_lock = threading.Lock()
+
 
 def _derived_store_path() -> str:
     token = session.get("derived_token")
@@ -16,41 +36,201 @@ def _derived_store_path() -> str:
         token = uuid.uuid4().hex
         session["derived_token"] = token
     upload_folder = Path(current_app.config["UPLOAD_FOLDER"])
-    return str(upload_folder / f"derived_{token}.json")
+    return str(upload_folder / f"derived_{token}.jsonl")
 
 
-def load_derived_rows() -> List[dict[str, Any]]:
-    path = _derived_store_path()
-    if not os.path.exists(path):
-        return []
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Exclusive cross-process lock for writers of ``path``.
+
+    The lock lives in a separate file so compaction can swap the log itself.
+    """
+    with open(f"{path}.lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _stamp(path: str) -> Optional[tuple[int, int, int]]:
     try:
-        with open(path, "r", encoding="utf-8") as handle:
-            return json.load(handle)
+        stats = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stats.st_ino, stats.st_size, stats.st_mtime_ns
+
+
+def _replay(path: str) -> _Replay:
+    """Return the live (id, row) entries of a log, its tombstone count and row contexts."""
+    live: dict[str, dict[str, Any]] = {}
+    contexts: dict[str, str] = {}
+    tombstones = 0
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn final line from an interrupted write
+                continue
+            if record.get("op") == "add":
+                live[record["id"]] = record["row"]
+                if record.get("ctx"):
+                    contexts[record["id"]] = record["ctx"]
+            elif record.get("op") == "del":
+                live.pop(record["id"], None)
+                contexts.pop(record["id"], None)
+                tombstones += 1
+    return list(live.items()), tombstones, contexts
+
+
+def _read_entries(path: str) -> _Replay:
+    stamp = _stamp(path)
+    if stamp is None:
+        return [], 0, {}
+    with _read_cache_lock:
+        cached = _read_cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            _read_cache.move_to_end(path)
+            return cached[1]
+    replayed = _replay(path)
+    with _read_cache_lock:
+        _read_cache[path] = (stamp, replayed)
+        _read_cache.move_to_end(path)
+        while len(_read_cache) > READ_CACHE_ENTRIES:
+            _read_cache.popitem(last=False)
+    return replayed
+
+
+def _add_record(row_id: str, row: dict[str, Any], context: Optional[str]) -> dict[str, Any]:
+    record = {"op": "add", "id": row_id, "row": row}
+    if context:
+        record["ctx"] = context
+    return record
+
+
+def _append_records(path: str, records: list[dict[str, Any]]) -> None:
+    payload = "".join(json.dumps(record) + "\n" for record in records)
+    # O_APPEND and a single write keep concurrent appends whole
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, payload.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+def _compact(path: str, entries: list[tuple[str, dict[str, Any]]], contexts: dict[str, str]) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            for row_id, row in entries:
+                handle.write(json.dumps(_add_record(row_id, row, contexts.get(row_id))) + "\n")
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_derived_entries() -> List[tuple[str, dict[str, Any]]]:
+    """Return the session's derived rows as (id, row) pairs in insertion order.
+
+    Rows are copies, so callers may modify them without touching the read cache.
+    """
+    try:
+        entries, _, _ = _read_entries(_derived_store_path())
     except Exception:  # pragma: no cover - defensive read
         return []
+    return [(row_id, dict(row)) for row_id, row in entries]
 
 
-def save_derived_rows(rows: list[dict[str, Any]]) -> None:
-    path = _derived_store_path()
+def load_derived_rows() -> List[dict[str, Any]]:
+    return [row for _, row in load_derived_entries()]
+
+
+def load_derived_rows_with_contexts() -> tuple[List[dict[str, Any]], List[Optional[str]]]:
+    """Derived rows plus the source ``obsContext`` XML of each (None when unknown)."""
     try:
-        with open(path, "w", encoding="utf-8") as handle:
-            json.dump(rows, handle)
-    except Exception as exc:  # pragma: no cover
-        current_app.logger.error("Failed to save derived rows: %s", exc)
+        entries, _, contexts = _read_entries(_derived_store_path())
+    except Exception:  # pragma: no cover - defensive read
+        return [], []
+    return [dict(row) for _, row in entries], [contexts.get(row_id) for row_id, _ in entries]
+
+
+def append_derived_rows(rows: list[dict[str, Any]], obs_contexts: Optional[list[Optional[str]]] = None) -> List[str]:
+    """Append ``rows`` (optionally with their source ``obsContext``) and return their new ids."""
+    path = _derived_store_path()
+    ids = [uuid.uuid4().hex for _ in rows]
+    contexts = obs_contexts if obs_contexts is not None else [None] * len(rows)
+    with _locked(path):
+        _append_records(path, [_add_record(*entry) for entry in zip(ids, rows, contexts)])
+    return ids
+
+
+def delete_derived_rows(ids: Iterable[str]) -> int:
+    """Delete rows by id; returns how many existed."""
+    path = _derived_store_path()
+    with _locked(path):
+        entries, tombstones, contexts = _read_entries(path)
+        live_ids = {row_id for row_id, _ in entries}
+        doomed = [row_id for row_id in dict.fromkeys(ids) if row_id in live_ids]
+        if not doomed:
+            return 0
+        tombstones += len(doomed)
+        remaining = len(entries) - len(doomed)
+        if tombstones >= COMPACT_MIN_TOMBSTONES and tombstones > remaining:
+            doomed_set = set(doomed)
+            _compact(path, [entry for entry in entries if entry[0] not in doomed_set], contexts)
+        else:
+            _append_records(path, [{"op": "del", "id": row_id} for row_id in doomed])
+    return len(doomed)
+
+
+def clear_derived_rows() -> None:
+    path = _derived_store_path()
+    with _locked(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def iter_psv_aligned(df: pd.DataFrame, chunk_rows: int = PSV_CHUNK_ROWS) -> Iterator[str]:
+    """Yield padded PSV text (header first) in blocks of ``chunk_rows`` lines.
+
+    Cells are stringified and measured one column at a time with vectorized
+    string operations; the widths are computed before this returns, so
+    conversion errors surface to the caller rather than mid-response.
+    """
+    if df is None or df.empty:
+        return iter(())
+    names = [str(col) for col in df.columns]
+    cells: list[pd.Series] = []
+    widths: list[int] = []
+    for i, name in enumerate(names):
+        col = df.iloc[:, i]
+        text = col.astype(str).where(col.notna(), "")
+        cells.append(text)
+        widths.append(max(len(name), int(text.str.len().max() or 0)))
+    header = "|".join(name.ljust(width) for name, width in zip(names, widths))
+
+    def chunks() -> Iterator[str]:
+        yield header + "\n"
+        for start in range(0, len(df), chunk_rows):
+            padded = [text.iloc[start : start + chunk_rows].str.ljust(width) for text, width in zip(cells, widths)]
+            lines = padded[0].str.cat(padded[1:], sep="|") if len(padded) > 1 else padded[0]
+            yield "\n".join(lines.tolist()) + "\n"
+
+    return chunks()
 
 
 def format_psv_aligned(df: pd.DataFrame) -> str:
     """Return PSV text with padded columns for readability."""
-    if df is None or df.empty:
-        return ""
-    str_df = df.applymap(lambda v: "" if pd.isna(v) else str(v))
-    widths = []
-    for col in str_df.columns:
-        col_width = max(len(str(col)), int(str_df[col].str.len().max() or 0))
-        widths.append(col_width)
-    header = "|".join(str(col).ljust(widths[i]) for i, col in enumerate(str_df.columns))
-    lines = [header]
-    for _, row in str_df.iterrows():
-        line = "|".join(str(row[i]).ljust(widths[i]) for i in range(len(widths)))
-        lines.append(line)
-    return "\n".join(lines) + "\n"
+    return "".join(iter_psv_aligned(df))
+
+
+def format_derived_xml(df: pd.DataFrame, obs_contexts: Optional[list[Optional[str]]] = None) -> str:
+    """Return derived rows as an indented ADES document (one ``optical`` per row)."""
+    return format_ades_xml(df, obs_contexts)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from typing import Any, Callable, Iterator, Optional
+
+import pandas as pd
+from flask import Response, current_app, request
+from werkzeug.wsgi import wrap_file
+
+from .metrics import stage_timer
+from .sidecar import FORMAT_VERSION
+
+EXPORTS_DIR_NAME = "exports"
+# Bump when the TSV layout changes so stale spools are not served; changes to
+# the parsed frame itself are covered by the sidecar FORMAT_VERSION in the key
+EXPORT_VERSION = 1
+TSV_CHUNK_ROWS = 5000
+GZIP_LEVEL = 6
+
+
+def export_key(file_digest: str, kind: str, *parts: Any) -> str:
+    """Stable identifier of one export of one upload (also its ETag)."""
+    payload = json.dumps([EXPORT_VERSION, FORMAT_VERSION, file_digest, kind, *parts], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def iter_tsv(df: pd.DataFrame, chunk_rows: int = TSV_CHUNK_ROWS) -> Iterator[bytes]:
+    """``df.to_csv(sep="\\t", index=False)`` encoded, ``chunk_rows`` rows at a time."""
+    if df.empty:
+        yield df.to_csv(sep="\t", index=False).encode("utf-8")
+        return
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start : start + chunk_rows]
+        yield chunk.to_csv(sep="\t", index=False, header=start == 0).encode("utf-8")
+
+
+def _exports_dir() -> str:
+    return os.path.join(current_app.config["UPLOAD_FOLDER"], EXPORTS_DIR_NAME)
+
+
+def _paths(directory: str, key: str) -> tuple[str, str]:
+    return os.path.join(directory, f"{key}.tsv.gz"), os.path.join(directory, f"{key}.json")
+
+
+def _spooled_size(directory: str, key: str) -> Optional[int]:
+    gz_path, meta_path = _paths(directory, key)
+    if not os.path.exists(gz_path):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as handle:
+            return int(json.load(handle)["size"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+class _Spool:
+    """Gzip-compresses chunks into ``<key>.tsv.gz``, published atomically on ``finish``.
+
+    The gzip stream has no timestamp or name, so every spool of the same
+    content is byte-identical and its ETag stays valid across rebuilds.
+    """
+
+    def __init__(self, directory: str, key: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.key = key
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        self.handle = os.fdopen(fd, "wb")
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self.size = 0
+
+    def write(self, chunk: bytes) -> bytes:
+        self.size += len(chunk)
+        compressed = self.compressor.compress(chunk)
+        self.handle.write(compressed)
+        return compressed
+
+    def finish(self) -> bytes:
+        tail = self.compressor.flush()
+        self.handle.write(tail)
+        self.handle.close()
+        gz_path, meta_path = _paths(self.directory, self.key)
+        fd, meta_tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump({"size": self.size}, handle)
+        # The meta goes last: a reader that finds it also finds the finished gzip
+        os.replace(self.tmp_path, gz_path)
+        os.replace(meta_tmp, meta_path)
+        from .storage import storage_manager
+
+        storage_manager.note_write(os.path.getsize(gz_path))
+        return tail
+
+    def abort(self) -> None:
+        self.handle.close()
+        try:
+            os.unlink(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def _accepts_gzip() -> bool:
+    return request.accept_encodings["gzip"] > 0
+
+
+def _headers(response: Response, key: str, gzipped: bool, download_name: str) -> Response:
+    response.set_etag(f"{key}-gz" if gzipped else key)
+    response.headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    response.vary.add("Accept-Encoding")
+    if gzipped:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def _tee_response(directory: str, key: str, chunks: Iterator[bytes], download_name: str) -> Response:
+    """Stream ``chunks`` to the client while spooling them for later range requests."""
+    gzipped = _accepts_gzip()
+
+    def body() -> Iterator[bytes]:
+        spool = _Spool(directory, key)
+        try:
+            for chunk in chunks:
+                compressed = spool.write(chunk)
+                out = compressed if gzipped else chunk
+                if out:
+                    yield out
+            tail = spool.finish()
+        except BaseException:
+            # Includes GeneratorExit when the client goes away mid-download
+            spool.abort()
+            raise
+        if gzipped and tail:
+            yield tail
+
+    response = Response(body(), content_type="text/plain; charset=utf-8")
+    return _headers(response, key, gzipped, download_name)
+
+
+def _spooled_response(directory: str, key: str, size: int, download_name: str) -> Response:
+    gz_path, _ = _paths(directory, key)
+    from .storage import storage_manager
+
+    storage_manager.touch(gz_path)
+    gzipped = _accepts_gzip()
+    if gzipped:
+        handle: Any = open(gz_path, "rb")
+        length = os.fstat(handle.fileno()).st_size
+    else:
+        # GzipFile is seekable, so ranges skip ahead without buffering
+        handle, length = gzip.open(gz_path, "rb"), size
+    response = Response(
+        wrap_file(request.environ, handle), content_type="text/plain; charset=utf-8", direct_passthrough=True
+    )
+    response.content_length = length
+    _headers(response, key, gzipped, download_name)
+    return response.make_conditional(request, accept_ranges=True, complete_length=length)
+
+
+def tsv_download(key: str, load_frame: Callable[[], pd.DataFrame], download_name: str) -> Response:
+    """Serve a frame as a TSV attachment, gzip-encoded when the client accepts it.
+
+    The first plain request streams straight from the (cached) frame and
+    spools a gzip copy under ``UPLOAD_FOLDER/exports``; later requests, and
+    any Range/If-Range/If-None-Match request, are served from the spool with
+    byte ranges. ``load_frame`` is only called when there is no spool yet.
+    """
+    directory = _exports_dir()
+    size = _spooled_size(directory, key)
+    if size is not None:
+        return _spooled_response(directory, key, size, download_name)
+
+    df = load_frame()
+    conditional = request.range is not None or "If-Range" in request.headers or request.if_none_match
+    if not conditional:
+        return _tee_response(directory, key, iter_tsv(df), download_name)
+
+    with stage_timer("format"):
+        spool = _Spool(directory, key)
+        try:
+            for chunk in iter_tsv(df):
+                spool.write(chunk)
+            spool.finish()
+        except BaseException:
+            spool.abort()
+            raise
+    return _spooled_response(directory, key, spool.size, download_name)
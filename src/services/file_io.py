@@ -1,68 +1,179 @@
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
 
 import pandas as pd
-from flask import current_app
+from flask import current_app, has_app_context
+from pandas.api.types import is_numeric_dtype
+
+from ..config import Config
+from .frame_cache import file_cache_key, frame_cache
+from .obstime_index import ObsTimeIndex, build_obstime_index
+from .psv_reader import read_ades_psv
+from .sidecar import load_sidecar, write_sidecar
+from .xml_reader import read_ades_xml
+
+
+def _logger() -> logging.Logger:
+    # The batch CLI runs these services without a Flask app
+    return current_app.logger if has_app_context() else logging.getLogger(__name__)
 
 
 def allowed_file(filename: str) -> bool:
-    allowed = current_app.config.get("ALLOWED_EXTENSIONS", set())
+    if has_app_context():
+        allowed = current_app.config.get("ALLOWED_EXTENSIONS", set())
+    else:
+        allowed = Config.ALLOWED_EXTENSIONS
     return "." in filename and filename.rsplit(".", 1)[1].lower() in allowed
 
 
-def read_file_to_dataframe(filepath: str, filename: str) -> pd.DataFrame:
-    """Read supported file types into a pandas DataFrame."""
+# Cached frames are handed out as shallow copies, which only protects the cache
+# under copy-on-write: the default from pandas 3.0, opt-in on 2.x
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+_obstime_indexes: OrderedDict[tuple[str, int, int], ObsTimeIndex] = OrderedDict()
+_obstime_indexes_lock = threading.Lock()
+OBSTIME_INDEXES_MAX = 32
+
+_known_digests: dict[tuple[str, int, int], str] = {}
+_known_digests_lock = threading.Lock()
+KNOWN_DIGESTS_MAX = 256
+
+
+def file_digest(filepath: str) -> str:
+    """SHA-256 of an upload, memoised on (path, size, mtime)."""
+    key = file_cache_key(filepath)
+    known = _known_digests.get(key)
+    return known if known is not None else _digest_for_key(key)
+
+
+def remember_digest(filepath: str, digest: str) -> None:
+    """Record a digest computed while the file was written, so it is never re-hashed."""
+    key = file_cache_key(filepath)
+    with _known_digests_lock:
+        if len(_known_digests) >= KNOWN_DIGESTS_MAX:
+            _known_digests.pop(next(iter(_known_digests)))
+        _known_digests[key] = digest
+
+
+@lru_cache(maxsize=256)
+def _digest_for_key(key: tuple[str, int, int]) -> str:
+    digest = hashlib.sha256()
+    with open(key[0], "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _in_upload_folder(filepath: str) -> bool:
+    """Whether ``filepath`` lives under the app's UPLOAD_FOLDER, where sidecars may be written."""
+    if not has_app_context():
+        return False
+    root = os.path.realpath(current_app.config["UPLOAD_FOLDER"])
+    try:
+        return os.path.commonpath([root, os.path.realpath(filepath)]) == root
+    except ValueError:  # different drives
+        return False
+
+
+def read_file_to_dataframe(filepath: str, filename: str, cache: bool = True) -> pd.DataFrame:
+    """Read supported file types into a pandas DataFrame.
+
+    Parsed frames are memoised per worker on (path, size, mtime), so repeated
+    requests against an unchanged upload skip the text parse entirely. On a
+    cache miss the columnar sidecar written by the first parse is loaded
+    instead (numeric columns memory-mapped), which keeps other workers from
+    re-parsing the text file too. Sidecars are only kept for files under
+    ``UPLOAD_FOLDER``, never next to arbitrary input files.
+    ``cache=False`` parses without touching either (one-shot batch reads).
+    """
+    if not cache:
+        return _parse_file_to_dataframe(filepath, filename)
+    key = file_cache_key(filepath)
+    df = frame_cache.get(key)
+    if df is None:
+        use_sidecar = _in_upload_folder(filepath)
+        df = load_sidecar(filepath) if use_sidecar else None
+        if df is None:
+            df = _parse_file_to_dataframe(filepath, filename)
+            if use_sidecar:
+                try:
+                    write_sidecar(filepath, df)
+                except Exception as exc:  # pragma: no cover - sidecar is an optimisation only
+                    _logger().warning("Could not write sidecar for %s: %s", filename, exc)
+        frame_cache.put(key, df)
+        _remember_index(key, build_obstime_index(df))
+    # Shallow copy: with copy-on-write, callers may change it without touching the cached frame
+    return df.copy(deep=False)
+
+
+def _parse_file_to_dataframe(filepath: str, filename: str) -> pd.DataFrame:
     ext = filename.rsplit(".", 1)[1].lower()
     
     try:
         if ext == "psv":
-            # Find header line: first line that begins with 'permID'
-            header_idx = None
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                for i, line in enumerate(f):
-                    s = line.lstrip()  # tolerate leading whitespace/BOM
-                    if s.startswith('permID'):
-                        header_idx = i
-                        break
-            if header_idx is not None:
-                # Use detected header row directly
-                df = pd.read_csv(filepath, sep='|', header=header_idx, engine='python')
-            else:
-                # Fallback: assume header is the first line
-                df = pd.read_csv(filepath, sep='|')
+            df = read_ades_psv(filepath)
         elif ext == "xml":
-            df = pd.read_xml(filepath, xpath="./obsBlock/obsData/*")
+            df = read_ades_xml(filepath)
         else:
             raise ValueError(f"Unsupported file extension: {ext}")
     except Exception as exc:  # pragma: no cover - defensive logging
-        current_app.logger.error("Error reading file %s: %s", filename, exc)
+        _logger().error("Error reading file %s: %s", filename, exc)
         raise
 
     df.rename(columns=lambda x: x.strip(), inplace=True)
     # Drop rows with missing obsTime
     df = df.dropna(subset=["obsTime"])
-    
-    
-    # Convert required columns to numeric types
-    df["ra"] = pd.to_numeric(df["ra"], errors="coerce")
-    df["dec"] = pd.to_numeric(df["dec"], errors="coerce")
+
     # Ensure photAp exists per strict format and coerce numeric for plotting
     if "photAp" not in df.columns:
         raise ValueError("Required column 'photAp' not found in uploaded file.")
-    df["photAp"] = pd.to_numeric(df["photAp"], errors="coerce")
+    # Convert required columns to numeric types (readers usually type them already)
+    for col in ("ra", "dec", "photAp"):
+        if not is_numeric_dtype(df[col].dtype):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
     # Sort the frame by PhotAp
     df = df.sort_values(by="photAp")
     return df
 
 
-def build_obstime_info(df: pd.DataFrame) -> tuple[list[str], dict[str, int]]:
-    """Return sorted obstime values and counts for UI rendering."""
-    vals = df["obsTime"].dropna().astype(str)
-    obstime_counts = vals.value_counts().to_dict()
-    unique_vals = pd.Index(vals.unique())
-    sort_df = pd.DataFrame({"value": unique_vals})
-    sort_df["dt"] = pd.to_datetime(sort_df["value"], errors="coerce")
-    sort_df = sort_df.sort_values(by=["dt", "value"], na_position="last")
-    available_obstimes = sort_df["value"].tolist()
-    return available_obstimes, obstime_counts
+def _remember_index(key: tuple[str, int, int], index: ObsTimeIndex) -> None:
+    with _obstime_indexes_lock:
+        _obstime_indexes[key] = index
+        _obstime_indexes.move_to_end(key)
+        while len(_obstime_indexes) > OBSTIME_INDEXES_MAX:
+            _obstime_indexes.popitem(last=False)
+
+
+def obstime_index(filepath: str, df: pd.DataFrame) -> ObsTimeIndex:
+    """The obsTime group index of the frame read from ``filepath``.
+
+    Built when the frame is loaded and kept per worker on (path, size, mtime);
+    ``df`` is only grouped again when the index was evicted.
+    """
+    key = file_cache_key(filepath)
+    with _obstime_indexes_lock:
+        index = _obstime_indexes.get(key)
+        if index is not None:
+            _obstime_indexes.move_to_end(key)
+            return index
+    index = build_obstime_index(df)
+    _remember_index(key, index)
+    return index
+
+
+def build_obstime_info(df: pd.DataFrame, filepath: Optional[str] = None) -> tuple[list[str], dict[str, int]]:
+    """Return sorted obstime values and counts for UI rendering.
+
+    With ``filepath`` the cached index of that file is used; without it
+    ``df`` is grouped from scratch.
+    """
+    index = obstime_index(filepath, df) if filepath is not None else build_obstime_index(df)
+    return index.keys, index.counts
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from .obstime_index import ObsTimeIndex, build_obstime_index
+
+FIT_COLUMNS = ["photAp", "ra", "dec", "rmsRA", "rmsDec"]
+ARCSEC_PER_DEG = 3600.0
+# How the output row of a group is chosen when fitting every group at once:
+#   picked  - only groups with a row picked in the UI
+#   min_rms - the UI pick when present, else the included row with the smallest rmsRA/rmsDec
+PICK_RULES = ("picked", "min_rms")
+# Rejection threshold of automatic exclusion, in robust standard deviations
+SIGMA_CLIP_DEFAULT = 3.0
+
+
+def error_sig_figs(value: float) -> int:
+    """Decimal places that keep one significant figure of ``value``."""
+    return int(abs(np.floor(np.log10(max(value, 1e-12))))) + 1
+
+
+def round_zero_aperture(intercept: float, rms: float) -> tuple[float, float]:
+    """Round a zero-aperture intercept (deg) and its error (arcsec).
+
+    The error is twice the picked row's rms, rounded to one significant
+    figure; the intercept keeps as many decimals as that error in degrees.
+    """
+    err = round(float(rms) * 2.0, error_sig_figs(float(rms) * 2.0))
+    # np.float64 rounding (not Python's decimal-exact round) matches the UI fit
+    value = round(np.float64(intercept), error_sig_figs(err / ARCSEC_PER_DEG))
+    return float(value), err
+
+
+def round_ra_zero_aperture(intercept: float, rms: float) -> tuple[float, float]:
+    """``round_zero_aperture`` for RA, folded into [0, 360) after rounding too.
+
+    The intercept is folded before rounding so its decimals are those of the
+    printed value; folding again afterwards turns 359.99999... rounded up to
+    360.0 into 0.0.
+    """
+    value, err = round_zero_aperture(float(intercept) % 360.0, rms)
+    return value % 360.0, err
+
+
+def unwrap_ra(ra: np.ndarray) -> np.ndarray:
+    """Make one group's RA (deg) continuous across 0/360.
+
+    Groups that do not straddle the wrap are returned untouched so their fit
+    is bit-for-bit the same as before.
+    """
+    if ra.size and np.ptp(ra) > 180.0:
+        ref = ra[0]
+        return ref + (ra - ref + 180.0) % 360.0 - 180.0
+    return ra
+
+
+def delta_ra_deg(ra: np.ndarray, ref: float) -> np.ndarray:
+    """Signed RA offset from ``ref`` in degrees, taking the short way round."""
+    return (np.asarray(ra, dtype=float) - ref + 180.0) % 360.0 - 180.0
+
+
+def fit_radec_lines(
+    x: np.ndarray, ra: np.ndarray, dec: np.ndarray, rms_ra: np.ndarray, rms_dec: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Weighted straight-line fits of RA and Dec (deg) against photAp.
+
+    Weights are 1/sigma with the rms converted from arcsec to degrees; when
+    either weighted fit fails both fall back to unweighted fits.
+    """
+    try:
+        ra_fit, _ = np.polyfit(x, ra, 1, w=1 / (rms_ra / ARCSEC_PER_DEG), cov="unscaled")
+        dec_fit, _ = np.polyfit(x, dec, 1, w=1 / (rms_dec / ARCSEC_PER_DEG), cov="unscaled")
+    except Exception:
+        ra_fit, _ = np.polyfit(x, ra, 1, cov="unscaled")
+        dec_fit, _ = np.polyfit(x, dec, 1, cov="unscaled")
+    return ra_fit, dec_fit
+
+
+def _unwrap_ra_grouped(codes: np.ndarray, n_groups: int, ra: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Grouped ``unwrap_ra``; also returns which groups were unwrapped."""
+    lo = np.full(n_groups, np.inf)
+    hi = np.full(n_groups, -np.inf)
+    np.minimum.at(lo, codes, ra)
+    np.maximum.at(hi, codes, ra)
+    wraps = (hi - lo) > 180.0
+    if not wraps.any():
+        return ra, wraps
+    ref = np.empty(n_groups)
+    ref[codes[::-1]] = ra[::-1]  # first RA of each group
+    rows = wraps[codes]
+    out = ra.copy()
+    out[rows] = ref[codes[rows]] + delta_ra_deg(ra[rows], ref[codes[rows]])
+    return out, wraps
+
+
+def grouped_weighted_lines(
+    codes: np.ndarray, n_groups: int, x: np.ndarray, y: np.ndarray, w: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Weighted least-squares lines ``y = a*x + b`` for every group at once.
+
+    ``w`` follows the ``np.polyfit`` convention (1/sigma). Sums are taken
+    around each group's weighted mean so large offsets such as RA in degrees
+    do not cancel catastrophically. Returns (intercept, slope, intercept
+    variance) per group; groups with fewer than two distinct x are NaN.
+    """
+    weights = w * w
+    s = np.bincount(codes, weights, n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = np.bincount(codes, weights * x, n_groups) / s
+        y_mean = np.bincount(codes, weights * y, n_groups) / s
+        dx = x - x_mean[codes]
+        dy = y - y_mean[codes]
+        sxx = np.bincount(codes, weights * dx * dx, n_groups)
+        sxy = np.bincount(codes, weights * dx * dy, n_groups)
+        slope = sxy / sxx
+        intercept = y_mean - slope * x_mean
+        intercept_var = 1.0 / s + x_mean * x_mean / sxx
+    degenerate = ~(sxx > 0)
+    intercept[degenerate] = np.nan
+    slope[degenerate] = np.nan
+    intercept_var[degenerate] = np.nan
+    return intercept, slope, intercept_var
+
+
+def _fit_weights(codes: np.ndarray, n_groups: int, rms_arcsec: np.ndarray) -> np.ndarray:
+    """1/sigma weights in degrees; groups with unusable rms fall back to unweighted."""
+    with np.errstate(divide="ignore"):
+        w = ARCSEC_PER_DEG / rms_arcsec
+    bad = ~np.isfinite(w) | (w <= 0)
+    bad_groups = np.bincount(codes, bad, n_groups) > 0
+    return np.where(bad_groups[codes], 1.0, w)
+
+
+def _fit_rows(
+    df: pd.DataFrame, excluded_by_obstime: Mapping[str, Iterable[str]]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """obsTime text, row ids and the mask of rows that take part in a fit."""
+    obstime = df["obsTime"].astype(str).to_numpy()
+    row_ids = df.index.astype(str).to_numpy()
+    excluded_pairs = [(str(key), str(i)) for key, ids in excluded_by_obstime.items() for i in ids or []]
+    excluded = pd.MultiIndex.from_arrays([obstime, row_ids]).isin(excluded_pairs)
+    usable = df[FIT_COLUMNS].notna().all(axis=1).to_numpy() & ~excluded & df["obsTime"].notna().to_numpy()
+    return obstime, row_ids, usable
+
+
+def _grouped_leverage(codes: np.ndarray, n_groups: int, x: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """Hat-matrix diagonal of each row in its group's weighted line fit."""
+    weights = w * w
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.bincount(codes, weights, n_groups)
+        x_mean = np.bincount(codes, weights * x, n_groups) / s
+        dx = x - x_mean[codes]
+        sxx = np.bincount(codes, weights * dx * dx, n_groups)
+        return weights * (1.0 / s[codes] + dx * dx / sxx[codes])
+
+
+def sigma_clip_groups(
+    df: pd.DataFrame,
+    excluded_by_obstime: Optional[Mapping[str, Iterable[str]]] = None,
+    sigma: float = SIGMA_CLIP_DEFAULT,
+    max_iter: int = 10,
+    min_points: int = 3,
+) -> dict[str, list[str]]:
+    """Iteratively sigma-clip the RA/Dec-vs-photAp fits of every obsTime group.
+
+    Each pass refits all groups at once with the weighted lines used by
+    ``fit_all_groups``. Residuals are externally studentized: scaled by the
+    row's rms, its leverage and the group's reduced chi-square without that
+    row (never less than 1), so a high-leverage outlier cannot hide by
+    pulling the line towards itself. The worst row of each group is clipped
+    when its RA or Dec residual exceeds ``sigma``. Existing exclusions are
+    kept, and a group never drops below ``min_points`` fitted rows. Returns
+    the merged exclusions, keyed like ``excluded_by_obstime``.
+    """
+    if sigma <= 0:
+        raise ValueError("sigma must be positive")
+    excluded_by_obstime = excluded_by_obstime or {}
+    obstime, row_ids, usable = _fit_rows(df, excluded_by_obstime)
+    fit_df = df.loc[usable, FIT_COLUMNS].astype(float)
+    codes, keys = pd.factorize(obstime[usable])
+    n_groups = len(keys)
+    x = fit_df["photAp"].to_numpy()
+    ra, _ = _unwrap_ra_grouped(codes, n_groups, fit_df["ra"].to_numpy())
+    coords = []
+    for y, rms_col in ((ra, "rmsRA"), (fit_df["dec"].to_numpy(), "rmsDec")):
+        coords.append((y, _fit_weights(codes, n_groups, fit_df[rms_col].to_numpy())))
+
+    active = np.ones(len(x), dtype=bool)
+    frozen = np.zeros(n_groups, dtype=bool)
+    for _ in range(max_iter):
+        # Clipped rows stay in the arrays with zero weight so group codes are unchanged
+        n_active = np.bincount(codes, active, n_groups)
+        score = np.zeros(len(x))
+        for y, w in coords:
+            fit_w = np.where(active, w, 0.0)
+            b, a, _ = grouped_weighted_lines(codes, n_groups, x, y, fit_w)
+            h = _grouped_leverage(codes, n_groups, x, fit_w)
+            z = (y - (a[codes] * x + b[codes])) * w
+            chi2 = np.bincount(codes, np.where(active, z * z, 0.0), n_groups)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # Reduced chi-square of the group without the row, never below 1
+                s2 = (chi2[codes] - z * z / (1.0 - h)) / (n_active[codes] - 3)
+                t = np.abs(z) / np.sqrt((1.0 - h) * np.fmax(s2, 1.0))
+            score = np.fmax(score, t / sigma)
+        # One row per group and pass, the worst, so one outlier cannot drag good rows out
+        score = np.where(active & np.isfinite(score), score, 0.0)
+        worst = np.zeros(n_groups)
+        np.maximum.at(worst, codes, score)
+        clip = (score > 1.0) & (score == worst[codes])
+        clip &= ~frozen[codes]
+        remaining = np.bincount(codes, active & ~clip, n_groups)
+        frozen |= remaining < min_points
+        clip &= ~frozen[codes]
+        if not clip.any():
+            break
+        active &= ~clip
+
+    out = {str(key): [str(i) for i in ids or []] for key, ids in excluded_by_obstime.items()}
+    clipped = ~active
+    for key, row_id in zip(obstime[usable][clipped], row_ids[usable][clipped]):
+        out.setdefault(str(key), []).append(str(row_id))
+    return out
+
+
+def _pick_positions(
+    obstime: np.ndarray, row_ids: np.ndarray, pick_obstime: Iterable[Any], pick_ids: Iterable[Any]
+) -> np.ndarray:
+    """Row position of each (obsTime, row id) pick, or -1 when the group has no such row.
+
+    Row ids may repeat (a non-unique index); a repeated id resolves to its
+    first row within the group.
+    """
+    rows = pd.Series(np.arange(len(row_ids)), index=pd.MultiIndex.from_arrays([obstime, row_ids]))
+    rows = rows[~rows.index.duplicated(keep="first")]
+    wanted = pd.MultiIndex.from_arrays(
+        [[str(t) for t in pick_obstime], ["" if p is None or pd.isna(p) else str(p) for p in pick_ids]]
+    )
+    return rows.reindex(wanted).fillna(-1).to_numpy(dtype=np.int64)
+
+
+def fit_all_groups(
+    df: pd.DataFrame,
+    excluded_by_obstime: Optional[Mapping[str, Iterable[str]]] = None,
+    picked_by_obstime: Optional[Mapping[str, str]] = None,
+    pick_rule: str = "picked",
+    groups: Optional[ObsTimeIndex] = None,
+) -> pd.DataFrame:
+    """Fit RA/Dec vs photAp for every obsTime group in ``df`` in one pass.
+
+    Rows are identified by their index label as a string (the UI ``_row_id``).
+    Excluded rows and rows missing any of ``FIT_COLUMNS`` are left out of the
+    fit. Returns one row per group with at least two fitted points, carrying
+    the raw intercepts and formal errors, the picked row id (if any) and the
+    rounded ``ra0``/``dec0``/``ra0_err``/``dec0_err`` used for derived entries.
+    Groups come out in the order of ``groups`` (built from ``df`` when not
+    given): by parsed obsTime, unparseable values last.
+    """
+    if pick_rule not in PICK_RULES:
+        raise ValueError(f"Unknown pick rule: {pick_rule}")
+    excluded_by_obstime = excluded_by_obstime or {}
+    picked_by_obstime = picked_by_obstime or {}
+
+    obstime, row_ids, usable = _fit_rows(df, excluded_by_obstime)
+    fit_df = df.loc[usable, FIT_COLUMNS].astype(float)
+    codes, keys = pd.factorize(obstime[usable])
+    n_groups = len(keys)
+    counts = np.bincount(codes, minlength=n_groups)
+    x = fit_df["photAp"].to_numpy()
+
+    results: dict[str, Any] = {"obsTime": np.asarray(keys, dtype=object), "n_points": counts}
+    ra, ra_wraps = _unwrap_ra_grouped(codes, n_groups, fit_df["ra"].to_numpy())
+    for coord, y, rms_col in (("ra", ra, "rmsRA"), ("dec", fit_df["dec"].to_numpy(), "rmsDec")):
+        w = _fit_weights(codes, n_groups, fit_df[rms_col].to_numpy())
+        b, _, b_var = grouped_weighted_lines(codes, n_groups, x, y, w)
+        if coord == "ra":
+            b = np.where(ra_wraps, b % 360.0, b)
+        results[f"{coord}_intercept"] = b
+        # Formal (unscaled covariance) intercept error, in arcsec
+        results[f"{coord}_intercept_err"] = np.sqrt(b_var) * ARCSEC_PER_DEG
+    fits = pd.DataFrame(results)
+
+    picked = [picked_by_obstime.get(str(key)) for key in keys]
+    if pick_rule == "min_rms":
+        quality = (fit_df["rmsRA"] ** 2 + fit_df["rmsDec"] ** 2).to_numpy()
+        order = np.lexsort((quality, codes))
+        first = order[np.r_[True, codes[order][1:] != codes[order][:-1]]] if len(order) else order
+        best_ids = row_ids[usable][first]
+        picked = [p if p is not None else best_ids[i] for i, p in enumerate(picked)]
+    fits["picked_id"] = pd.Series(picked, dtype=object)
+
+    # A pick only counts if it names a row of the same group
+    pick_pos = _pick_positions(obstime, row_ids, fits["obsTime"], fits["picked_id"])
+    valid_pick = pick_pos >= 0
+    fits = fits[(fits["n_points"] >= 2) & valid_pick & fits["ra_intercept"].notna() & fits["dec_intercept"].notna()]
+    pick_pos = pick_pos[fits.index.to_numpy()]
+    fits = fits.reset_index(drop=True)
+
+    pick_rms = df[["rmsRA", "rmsDec"]].apply(pd.to_numeric, errors="coerce").to_numpy()[pick_pos]
+    rounded = [
+        (*round_ra_zero_aperture(ra_b, ra_rms), *round_zero_aperture(dec_b, dec_rms))
+        if np.isfinite(ra_rms) and np.isfinite(dec_rms)
+        else (np.nan,) * 4
+        for ra_b, dec_b, (ra_rms, dec_rms) in zip(fits["ra_intercept"], fits["dec_intercept"], pick_rms)
+    ]
+    rounded_df = pd.DataFrame(rounded, columns=["ra0", "ra0_err", "dec0", "dec0_err"], dtype=float)
+    fits[["ra0", "dec0", "ra0_err", "dec0_err"]] = rounded_df[["ra0", "dec0", "ra0_err", "dec0_err"]]
+    fits = fits.dropna(subset=["ra0", "dec0"])
+    if groups is None:
+        groups = build_obstime_index(df)
+    # Chronological: index keys are ordered by epoch_ns, so mixed-precision
+    # timestamps sort by time rather than by text
+    rank = fits["obsTime"].map(groups.slot).to_numpy()
+    return fits.iloc[np.argsort(rank, kind="stable")].reset_index(drop=True)
+
+
+def build_derived_row(
+    output_row: pd.Series, columns: Iterable[str], ra0: float, dec0: float, ra0_err: float, dec0_err: float
+) -> dict[str, Any]:
+    """Return the picked row with the zero-aperture position applied, JSON-ready."""
+    aligned = output_row.copy()
+    aligned["ra"] = ra0
+    aligned["dec"] = dec0
+    aligned["rmsRA"] = ra0_err
+    aligned["rmsDec"] = dec0_err
+    # Ensure notes has no whitespace (remove spaces, tabs, newlines)
+    raw_notes = aligned.get("notes")
+    cleaned_notes = "" if raw_notes is None or pd.isna(raw_notes) else "".join(str(raw_notes).split())
+    aligned["notes"] = "e" + cleaned_notes
+    row_dict: dict[str, Any] = {}
+    for col in columns:
+        value = aligned[col] if col in aligned else None
+        if value is not None and not isinstance(value, str) and pd.isna(value):
+            value = None
+        elif hasattr(value, "item"):
+            value = value.item()
+        row_dict[col] = value
+    return row_dict
+
+
+def build_derived_rows(df: pd.DataFrame, fits: pd.DataFrame) -> list[dict[str, Any]]:
+    """Derived entries for every fitted group, in ``fits`` order.
+
+    Vectorized equivalent of calling ``build_derived_row`` per group.
+    """
+    columns = [c for c in df.columns if c != "_row_id"]
+    obstime = df["obsTime"].astype(str).to_numpy()
+    positions = _pick_positions(obstime, df.index.astype(str).to_numpy(), fits["obsTime"], fits["picked_id"])
+    out = df.iloc[positions][columns].reset_index(drop=True)
+    for col, src in (("ra", "ra0"), ("dec", "dec0"), ("rmsRA", "ra0_err"), ("rmsDec", "dec0_err")):
+        out[col] = fits[src].to_numpy()
+    if "notes" in out.columns:
+        notes = out["notes"].astype(object)
+        cleaned = notes.where(notes.notna(), "").astype(str).str.split().str.join("")
+        out["notes"] = "e" + cleaned
+    out = out.astype(object)
+    return out.where(out.notna(), None).to_dict("records")
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Hashable, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256MB
+
+
+def file_cache_key(filepath: str) -> tuple[str, int, int]:
+    """Return a (path, size, mtime) key that changes whenever the file does."""
+    stats = os.stat(filepath)
+    return os.path.abspath(filepath), stats.st_size, stats.st_mtime_ns
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Approximate in-memory size of a frame, including object payloads."""
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:  # pragma: no cover - exotic dtypes
+        return int(df.memory_usage(index=True).sum())
+
+
+class FrameCache:
+    """Per-process LRU cache of parsed frames bounded by total frame memory."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = int(max_bytes)
+        self._entries: OrderedDict[Hashable, tuple[pd.DataFrame, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, df: pd.DataFrame) -> None:
+        size = frame_nbytes(df)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (df, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+frame_cache = FrameCache()
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .fitting import ARCSEC_PER_DEG, FIT_COLUMNS, delta_ra_deg, round_ra_zero_aperture, round_zero_aperture
+
+# Groups whose per-row sums are kept per worker, keyed by (file, obsTime)
+GROUP_STATS_MAX = 256
+# Layout of the last axis of ``GroupStats.contrib``; BAD counts rows whose rms gives no weight
+N, SW, SWX, SWXX, SWY, SWXY, BAD = range(7)
+# First axis of a row's contribution: 1/sigma² weights, or the unweighted fallback
+WEIGHTED, UNWEIGHTED = range(2)
+
+_group_stats: OrderedDict[Hashable, "GroupStats"] = OrderedDict()
+_group_stats_lock = threading.Lock()
+
+
+@dataclass
+class GroupStats:
+    """Weighted least-squares sums of one obsTime group, row by row.
+
+    ``contrib[i, k, c]`` is row ``i``'s share of (n, Σw, Σwx, Σwx², Σwy,
+    Σwxy, bad) for coordinate ``c`` (0 = RA, 1 = Dec), with w = 1/sigma² in
+    degrees for ``k = WEIGHTED`` and w = 1 for ``k = UNWEIGHTED``; x, y are
+    taken relative to ``x_ref``/``y_ref`` so the sums do not cancel. Rows
+    missing a fit column contribute nothing. The sums for any exclusion set
+    are ``totals`` minus the excluded rows; the last set is remembered, so
+    toggling one row is a single add or subtract. As in the grouped fit, a
+    coordinate falls back to the unweighted sums while any row left in has
+    an rms that gives no weight.
+    """
+
+    row_ids: list[str]
+    slot: dict[str, int]
+    contrib: np.ndarray
+    totals: np.ndarray
+    x_ref: float
+    y_ref: np.ndarray
+    rms: np.ndarray
+    _last: Optional[tuple[frozenset[str], np.ndarray]] = field(default=None, repr=False, compare=False)
+
+    def sums(self, excluded_ids: Iterable[str]) -> np.ndarray:
+        """(2, 2, 7) sums of the rows not in ``excluded_ids``."""
+        key = frozenset(str(i) for i in excluded_ids or [] if str(i) in self.slot)
+        last = self._last
+        if last is not None:
+            last_key, last_sums = last
+            if last_key == key:
+                return last_sums
+            changed = last_key ^ key
+            if len(changed) == 1:
+                row = next(iter(changed))
+                step = self.contrib[self.slot[row]]
+                sums = last_sums - step if row in key else last_sums + step
+                self._last = (key, sums)
+                return sums
+        sums = self.totals - self.contrib[[self.slot[i] for i in key]].sum(axis=0)
+        self._last = (key, sums)
+        return sums
+
+    def fit(self, excluded_ids: Iterable[str], picked_id: Optional[str] = None) -> Optional[dict[str, Any]]:
+        """Zero-aperture intercepts of the group without ``excluded_ids``.
+
+        Returns None when either coordinate has fewer than two distinct
+        photAp values left. ``ra0``/``dec0`` and their errors are rounded as
+        for a derived entry when ``picked_id`` names a row with rms values.
+        """
+        sums = self.sums(excluded_ids)
+        out: dict[str, Any] = {"n_points": int(sums[WEIGHTED, 0, N])}
+        for c, name in enumerate(("ra", "dec")):
+            k = UNWEIGHTED if sums[WEIGHTED, c, BAD] > 0 else WEIGHTED
+            n, s, sx, sxx, sy, sxy = sums[k, c, :BAD]
+            if n < 2 or s <= 0:
+                return None
+            x_mean, y_mean = sx / s, sy / s
+            var_x = sxx - sx * x_mean
+            if not var_x > 0:
+                return None
+            slope = (sxy - sx * y_mean) / var_x
+            # Evaluate at photAp = 0, i.e. x = -x_ref in shifted coordinates
+            intercept = self.y_ref[c] + y_mean - slope * (x_mean + self.x_ref)
+            intercept_var = 1.0 / s + (x_mean + self.x_ref) ** 2 / var_x
+            if name == "ra":
+                intercept %= 360.0
+            out[f"{name}_intercept"] = float(intercept)
+            out[f"{name}_slope"] = float(slope)
+            out[f"{name}_intercept_err"] = float(np.sqrt(intercept_var) * ARCSEC_PER_DEG)
+
+        rms = self.rms[self.slot[str(picked_id)]] if picked_id is not None and str(picked_id) in self.slot else None
+        if rms is not None and np.isfinite(rms).all():
+            out["ra0"], out["ra0_err"] = round_ra_zero_aperture(out["ra_intercept"], rms[0])
+            out["dec0"], out["dec0_err"] = round_zero_aperture(out["dec_intercept"], rms[1])
+        else:
+            out["ra0"] = out["dec0"] = out["ra0_err"] = out["dec0_err"] = None
+        return out
+
+
+def build_group_stats(group: pd.DataFrame) -> GroupStats:
+    """Per-row sufficient statistics of one obsTime group (rows labelled by index)."""
+    row_ids = group.index.astype(str).tolist()
+    values = group[FIT_COLUMNS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    # Any rms that is present takes part, as in the grouped fit; the positions must be finite
+    usable = np.isfinite(values[:, :3]).all(axis=1) & ~np.isnan(values[:, 3:]).any(axis=1)
+    x, ra, dec, rms_ra, rms_dec = values.T
+
+    contrib = np.zeros((len(group), 2, 2, 7))
+    x_ref = float(x[usable].mean()) if usable.any() else 0.0
+    y_ref = np.zeros(2)
+    if usable.any():
+        first = int(np.argmax(usable))
+        y_ref[:] = ra[first], dec[first]
+        dx = np.where(usable, x - x_ref, 0.0)
+        # Offsets from the first row; RA the short way round, as when unwrapping
+        offsets = (delta_ra_deg(ra, y_ref[0]), dec - y_ref[1])
+        for c, (dy, rms) in enumerate(zip(offsets, (rms_ra, rms_dec))):
+            with np.errstate(divide="ignore"):
+                w = (ARCSEC_PER_DEG / rms) ** 2
+            bad = usable & ~(np.isfinite(w) & (w > 0))
+            dy = np.where(usable, dy, 0.0)
+            for k, weights in ((WEIGHTED, np.where(usable & ~bad, w, 0.0)), (UNWEIGHTED, usable * 1.0)):
+                contrib[:, k, c, N] = usable
+                contrib[:, k, c, SW] = weights
+                contrib[:, k, c, SWX] = weights * dx
+                contrib[:, k, c, SWXX] = weights * dx * dx
+                contrib[:, k, c, SWY] = weights * dy
+                contrib[:, k, c, SWXY] = weights * dx * dy
+                contrib[:, k, c, BAD] = bad
+
+    return GroupStats(
+        row_ids=row_ids,
+        slot={row_id: i for i, row_id in enumerate(row_ids)},
+        contrib=contrib,
+        totals=contrib.sum(axis=0),
+        x_ref=x_ref,
+        y_ref=y_ref,
+        rms=np.column_stack((rms_ra, rms_dec)),
+    )
+
+
+def group_stats(cache_key: Hashable, obstime: str, load_group: Callable[[], pd.DataFrame]) -> GroupStats:
+    """Cached ``GroupStats`` of ``obstime``; ``load_group`` is only called on a miss."""
+    key = (cache_key, str(obstime))
+    with _group_stats_lock:
+        stats = _group_stats.get(key)
+        if stats is not None:
+            _group_stats.move_to_end(key)
+            return stats
+    stats = build_group_stats(load_group())
+    with _group_stats_lock:
+        _group_stats[key] = stats
+        while len(_group_stats) > GROUP_STATS_MAX:
+            _group_stats.popitem(last=False)
+    return stats
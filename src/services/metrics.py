@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from flask import Flask, g, has_request_context, request
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = tuple(1024 * 4**i for i in range(8))  # 1KB .. 16MB
+METRICS_DIR_NAME = "metrics"
+# Each worker writes its snapshot for /metrics at most this often
+FLUSH_INTERVAL_SECONDS = 1.0
+
+
+def _label_key(labels: dict[str, str]) -> str:
+    return json.dumps(labels, sort_keys=True)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...]) -> None:
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            series = {key: {**s, "counts": list(s["counts"])} for key, s in self._series.items()}
+        return {"type": self.kind, "help": self.help, "buckets": list(self.buckets), "series": series}
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self._series: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {"type": self.kind, "help": self.help, "series": dict(self._series)}
+
+
+class MetricsRegistry:
+    """Process-local metrics, shared between gunicorn workers through snapshot files.
+
+    Every worker periodically writes its cumulative metrics to
+    ``<directory>/<pid>.json``; ``render`` merges all snapshots so whichever
+    worker answers ``/metrics`` reports the whole server. Collector callbacks
+    supply point-in-time gauges (cache sizes) and are only merged from live
+    workers.
+    """
+
+    def __init__(self) -> None:
+        self.directory: Optional[str] = None
+        self._metrics: dict[str, Histogram | Counter] = {}
+        self._collectors: list[Callable[[], dict[str, tuple[str, str, float]]]] = []
+        self._shared_collectors: list[Callable[[], dict[str, tuple[str, str, list[tuple[dict[str, str], float]]]]]] = []
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._pending: Optional[threading.Timer] = None
+
+    def histogram(self, name: str, help_text: str, buckets: tuple[float, ...] = SECONDS_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def register_collector(self, collector: Callable[[], dict[str, tuple[str, str, float]]]) -> None:
+        """``collector`` returns {name: (type, help, value)} for unlabelled counters/gauges."""
+        self._collectors.append(collector)
+
+    def register_shared_collector(
+        self, collector: Callable[[], dict[str, tuple[str, str, list[tuple[dict[str, str], float]]]]]
+    ) -> None:
+        """``collector`` returns {name: (type, help, [(labels, value), ...])} for server-wide gauges.
+
+        Shared values (disk usage, say) are the same in every worker, so they
+        are not snapshotted and summed; the worker answering ``/metrics``
+        reports them once.
+        """
+        self._shared_collectors.append(collector)
+
+    def snapshot(self) -> dict[str, Any]:
+        metrics = {name: metric.snapshot() for name, metric in self._metrics.items()}
+        for collector in self._collectors:
+            for name, (kind, help_text, value) in collector().items():
+                metrics[name] = {"type": kind, "help": help_text, "series": {_label_key({}): value}}
+        return {"pid": os.getpid(), "time": time.time(), "metrics": metrics}
+
+    def flush(self, force: bool = False) -> None:
+        if not self.directory:
+            return
+        now = time.time()
+        if not force and now - self._last_flush < FLUSH_INTERVAL_SECONDS:
+            # Throttled: make sure the trailing updates still reach the file
+            if self._pending is None or not self._pending.is_alive():
+                self._pending = threading.Timer(FLUSH_INTERVAL_SECONDS, self.flush, kwargs={"force": True})
+                self._pending.daemon = True
+                self._pending.start()
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = now
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(self.snapshot(), handle)
+            os.replace(tmp_path, os.path.join(self.directory, f"{os.getpid()}.json"))
+        except OSError:  # pragma: no cover - metrics are best effort
+            pass
+        finally:
+            self._flush_lock.release()
+
+    def _snapshots(self) -> list[dict[str, Any]]:
+        own = self.snapshot()
+        snapshots = [own]
+        if self.directory and os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".json") or entry.name == f"{own['pid']}.json":
+                    continue
+                try:
+                    with open(entry.path, "r", encoding="utf-8") as handle:
+                        snapshots.append(json.load(handle))
+                except (OSError, ValueError):
+                    continue
+        return snapshots
+
+    def render(self) -> str:
+        """Prometheus text exposition of the metrics of every worker."""
+        merged: dict[str, dict[str, Any]] = {}
+        for snap in self._snapshots():
+            alive = _pid_alive(snap.get("pid"))
+            for name, metric in snap["metrics"].items():
+                if metric["type"] == "gauge" and not alive:
+                    continue
+                target = merged.setdefault(
+                    name, {"type": metric["type"], "help": metric["help"], "buckets": metric.get("buckets"), "series": {}}
+                )
+                for key, value in metric["series"].items():
+                    current = target["series"].get(key)
+                    if metric["type"] == "histogram":
+                        if current is None:
+                            target["series"][key] = {**value, "counts": list(value["counts"])}
+                        else:
+                            current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                            current["sum"] += value["sum"]
+                            current["count"] += value["count"]
+                    else:
+                        target["series"][key] = (current or 0.0) + value
+
+        for collector in self._shared_collectors:
+            for name, (kind, help_text, series) in collector().items():
+                merged[name] = {
+                    "type": kind,
+                    "help": help_text,
+                    "buckets": None,
+                    "series": {_label_key(labels): value for labels, value in series},
+                }
+
+        lines: list[str] = []
+        for name in sorted(merged):
+            metric = merged[name]
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for key, value in sorted(metric["series"].items()):
+                labels = json.loads(key)
+                if metric["type"] == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(metric["buckets"], value["counts"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {value['count']}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(value['sum'])}")
+                    lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+registry = MetricsRegistry()
+stage_seconds = registry.histogram("zaac_stage_seconds", "Time spent in request stages")
+request_seconds = registry.histogram("zaac_request_seconds", "Request latency by endpoint")
+upload_bytes = registry.histogram("zaac_upload_bytes", "Size of uploaded files", BYTES_BUCKETS)
+
+
+@contextmanager
+def stage_timer(name: str) -> Iterator[None]:
+    """Time a stage into ``zaac_stage_seconds`` and the response's Server-Timing header."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=name)
+        if has_request_context():
+            timings = g.setdefault("server_timing", {})
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def _cache_collector() -> dict[str, tuple[str, str, float]]:
+    from .frame_cache import frame_cache
+    from .plot_cache import plot_cache
+
+    values: dict[str, tuple[str, str, float]] = {}
+    for prefix, stats in (("zaac_frame_cache", frame_cache.stats()), ("zaac_plot_cache", plot_cache.stats())):
+        values[f"{prefix}_hits_total"] = ("counter", "Cache lookups that hit", stats["hits"])
+        values[f"{prefix}_misses_total"] = ("counter", "Cache lookups that missed", stats["misses"])
+        values[f"{prefix}_entries"] = ("gauge", "Entries held in memory", stats["entries"])
+        values[f"{prefix}_bytes"] = ("gauge", "Bytes held in memory", stats["bytes"])
+    return values
+
+
+registry.register_collector(_cache_collector)
+
+
+def init_metrics(app: Flask) -> None:
+    """Time every request, add Server-Timing headers and share snapshots under UPLOAD_FOLDER."""
+    registry.directory = os.path.join(app.config["UPLOAD_FOLDER"], METRICS_DIR_NAME)
+
+    @app.before_request
+    def _start_timer() -> None:
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _finish_timer(response: Any) -> Any:
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        total = time.perf_counter() - started
+        request_seconds.observe(total, endpoint=request.endpoint or "unknown", method=request.method)
+        timings = g.pop("server_timing", {})
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+        entries.append(f"total;dur={total * 1000:.1f}")
+        response.headers.add("Server-Timing", ", ".join(entries))
+        registry.flush()
+        return response
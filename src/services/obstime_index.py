@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+NAT_EPOCH = np.iinfo(np.int64).min
+
+
+@dataclass(frozen=True)
+class ObsTimeIndex:
+    """Row positions of every obsTime group of a parsed frame.
+
+    ``keys`` are the distinct obsTime strings in display order (by parsed
+    time, unparseable values last, ties by text) with their row ``counts``.
+    Rows of one group occupy ``order[bounds[k]:bounds[k + 1]]`` in ascending
+    position, so a group is found by one dict lookup and a slice. ``epoch_ns``
+    holds each row's obsTime as int64 nanoseconds (``NAT_EPOCH`` if it does
+    not parse).
+    """
+
+    keys: list[str]
+    counts: dict[str, int]
+    epoch_ns: np.ndarray
+    order: np.ndarray
+    bounds: np.ndarray
+    slot: dict[str, int]
+
+    def positions(self, obstime: str) -> np.ndarray:
+        """Row positions of ``obstime`` (empty when the group does not exist)."""
+        k = self.slot.get(str(obstime))
+        if k is None:
+            return self.order[:0]
+        return self.order[self.bounds[k] : self.bounds[k + 1]]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.epoch_ns.nbytes + self.order.nbytes + self.bounds.nbytes)
+
+
+def _parse_obstimes(values: pd.Series) -> pd.Series:
+    """Parse ISO 8601 obsTime text; unparseable values become NaT.
+
+    The format is not inferred from the first value, so mixed precision
+    (``...T01:02:03Z`` next to ``...T01:02:03.5Z``) parses throughout.
+    """
+    return pd.to_datetime(values, errors="coerce", format="ISO8601")
+
+
+def build_obstime_index(df: pd.DataFrame) -> ObsTimeIndex:
+    """Group ``df`` by its obsTime text once: one string conversion, one sort."""
+    present = df["obsTime"].notna().to_numpy()
+    text = df["obsTime"].astype(str).to_numpy()
+    codes, uniques = pd.factorize(text)
+    codes[~present] = -1
+
+    # Parse each distinct value once, then order groups by (time, text)
+    parsed = _parse_obstimes(pd.Series(uniques, dtype=object))
+    unique_ns = parsed.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    unparsed = parsed.isna().to_numpy()
+    used = np.bincount(codes[present], minlength=len(uniques)) > 0
+    group_order = [g for g in np.lexsort((np.asarray(uniques, dtype=str), unique_ns, unparsed)) if used[g]]
+
+    rank = np.full(len(uniques), -1, dtype=np.int64)
+    rank[group_order] = np.arange(len(group_order))
+    row_rank = np.where(codes >= 0, rank[np.maximum(codes, 0)], -1)
+    order = np.argsort(row_rank, kind="stable")
+    order = order[row_rank[order] >= 0]
+    sizes = np.bincount(row_rank[row_rank >= 0], minlength=len(group_order))
+    bounds = np.concatenate(([0], np.cumsum(sizes)))
+
+    keys = [str(uniques[g]) for g in group_order]
+    epoch_ns = np.where(codes >= 0, unique_ns[np.maximum(codes, 0)], NAT_EPOCH)
+    return ObsTimeIndex(
+        keys=keys,
+        counts={key: int(n) for key, n in zip(keys, sizes)},
+        epoch_ns=epoch_ns.astype(np.int64),
+        order=order.astype(np.int64),
+        bounds=bounds.astype(np.int64),
+        slot={key: k for k, key in enumerate(keys)},
+    )
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64MB
+# Bump when the rendered figure changes so stale PNGs are not served
+PLOT_VERSION = 2
+
+
+def plot_etag(file_digest: str, obstime: str, excluded_ids: Iterable[str], picked_id: Optional[str]) -> str:
+    """Stable identifier of a rendered group plot."""
+    parts = [
+        str(PLOT_VERSION),
+        file_digest,
+        str(obstime),
+        ",".join(sorted(str(i) for i in excluded_ids or [])),
+        str(picked_id or ""),
+    ]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class PlotCache:
+    """Rendered PNG bytes keyed by ``plot_etag``.
+
+    A bounded in-memory LRU sits in front of an optional directory shared by
+    all workers, so a plot rendered by one worker is a file read for the rest.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, directory: Optional[str] = None) -> None:
+        self.max_bytes = int(max_bytes)
+        self.directory = directory
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        return os.path.join(self.directory, f"{key}.png") if self.directory else None
+
+    def _remember(self, key: str, png: bytes) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= len(old)
+            if len(png) > self.max_bytes:
+                return
+            self._entries[key] = png
+            self._total_bytes += len(png)
+            while self._total_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return png
+        path = self._disk_path(key)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as handle:
+                    png = handle.read()
+            except OSError:
+                png = None
+            if png:
+                from .storage import storage_manager
+
+                storage_manager.touch(path)
+                self._remember(key, png)
+                with self._lock:
+                    self.hits += 1
+                return png
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, png: bytes) -> None:
+        self._remember(key, png)
+        path = self._disk_path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(png)
+            os.replace(tmp_path, path)
+            from .storage import storage_manager
+
+            storage_manager.note_write(len(png))
+        except OSError:  # pragma: no cover - disk tier is best effort
+            pass
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+plot_cache = PlotCache()
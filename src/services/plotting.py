@@ -1,42 +1,48 @@
 from __future__ import annotations
 
-import base64
 import io
-from typing import Any, Dict, Optional
+from typing import Any, Iterable, Optional
 
-import astropy.units as u
-import matplotlib
-
-matplotlib.use("Agg")  # Non-interactive backend for server environments
-
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from astropy.coordinates import SkyCoord
 from flask import session
 
+from .fitting import (
+    ARCSEC_PER_DEG,
+    FIT_COLUMNS,
+    build_derived_row,
+    delta_ra_deg,
+    fit_radec_lines,
+    round_ra_zero_aperture,
+    round_zero_aperture,
+    unwrap_ra,
+)
+from .obstime_index import ObsTimeIndex
+from .selection import find_output_row, split_obstime_group
+
+
+def _row_ids(df: pd.DataFrame) -> list[str]:
+    return (df["_row_id"] if "_row_id" in df.columns else df.index).astype(str).tolist()
+
 
-def generate_group_plots(
+def prepare_group_fit(
     group: pd.DataFrame, output_row: Optional[pd.Series] = None, full_group: Optional[pd.DataFrame] = None
-) -> Dict[str, str]:
-    """Generate combined RA/Dec vs photAp plot with weighted linear fits."""
-    group_orig = group.dropna(subset=["photAp", "ra", "dec", "rmsRA", "rmsDec"]).copy()
-    group_fit = group.dropna(subset=["photAp", "ra", "dec", "rmsRA", "rmsDec"]).copy()
-    urls: Dict[str, str] = {}
-    if group_orig.empty or output_row is None:
-        return urls
+) -> Optional[dict[str, Any]]:
+    """Fit one obsTime group and collect everything needed to stage and draw it.
 
-    coords = SkyCoord(ra=group_fit["ra"], dec=group_fit["dec"], unit=u.deg, frame="icrs")
-    coords_rms = SkyCoord(ra=group_fit["rmsRA"], dec=group_fit["rmsDec"], unit=u.arcsec, frame="icrs")
+    ``group`` holds the included rows, ``full_group`` the whole group (so the
+    excluded points can be shown) and ``output_row`` the picked row. Returns
+    None when there is nothing to fit.
+    """
+    group_orig = group.dropna(subset=FIT_COLUMNS).copy()
+    group_fit = group.dropna(subset=FIT_COLUMNS).copy()
+    if group_orig.empty or output_row is None:
+        return None
 
-    fullcoords = None
-    fullcoords_rms = None
     excluded_subset = None
     if isinstance(full_group, pd.DataFrame) and not full_group.empty:
-        full_orig = full_group.dropna(subset=["photAp", "ra", "dec", "rmsRA", "rmsDec"]).copy()
+        full_orig = full_group.dropna(subset=FIT_COLUMNS).copy()
         if not full_orig.empty:
-            fullcoords = SkyCoord(ra=full_orig["ra"], dec=full_orig["dec"], unit=u.deg, frame="icrs")
-            fullcoords_rms = SkyCoord(ra=full_orig["rmsRA"], dec=full_orig["rmsDec"], unit=u.arcsec, frame="icrs")
 
             def _ids(df: pd.DataFrame) -> set[str]:
                 if "_row_id" in df.columns:
@@ -57,142 +63,201 @@ def generate_group_plots(
                 excluded_subset = None
 
     if len(group_fit) < 2:
-        return urls
+        return None
 
     try:
-        x = group_fit["photAp"].astype(float)
-
-        try:
-            ra_fit, _ = np.polyfit(x, coords.ra.deg, 1, w=1 / coords_rms.ra.deg, cov="unscaled")
-            dec_fit, _ = np.polyfit(x, coords.dec.deg, 1, w=1 / coords_rms.dec.deg, cov="unscaled")
-        except Exception:
-            ra_fit, _ = np.polyfit(x, coords.ra.deg, 1, cov="unscaled")
-            dec_fit, _ = np.polyfit(x, coords.dec.deg, 1, cov="unscaled")
-
-        rms_ra = float(output_row["rmsRA"])
-        raerr_sigfigs = abs(np.floor(np.log10(max(rms_ra * 2.0, 1e-12)))) + 1
-        ra0_err = round(rms_ra * 2.0, int(raerr_sigfigs))
-        ra0_ploterr = ra0_err
-        ra_sig_figs = abs(np.floor(np.log10(max(ra0_ploterr / 3600.0, 1e-12)))) + 1
-        ra0 = round(np.polyval(ra_fit, 0.0), int(ra_sig_figs))
-
-        rms_dec = float(output_row["rmsDec"])
-        decerr_sigfigs = abs(np.floor(np.log10(max(rms_dec * 2.0, 1e-12)))) + 1
-        dec0_err = round(rms_dec * 2.0, int(decerr_sigfigs))
-        dec0_ploterr = dec0_err
-        dec_sig_figs = abs(np.floor(np.log10(max(dec0_ploterr / 3600.0, 1e-12)))) + 1
-        dec0 = round(np.polyval(dec_fit, 0.0), int(dec_sig_figs))
-        obs_time = str(output_row.get("obsTime", "Selected group"))
-
-        ra_y = np.cos(np.radians(dec0)) * (coords.ra.deg - np.median(coords.ra.deg)) * 3600
-        ra_y_err = coords_rms.ra.arcsec
-
-        ex_ra_y = ex_ra_y_err = ex_dec_y = ex_dec_y_err = ex_x = None
-        if fullcoords is not None and excluded_subset is not None and not excluded_subset.empty:
-            ex_coords = SkyCoord(ra=excluded_subset["ra"], dec=excluded_subset["dec"], unit=u.deg, frame="icrs")
-            ex_coords_rms = SkyCoord(ra=excluded_subset["rmsRA"], dec=excluded_subset["rmsDec"], unit=u.arcsec, frame="icrs")
-            ex_x = excluded_subset["photAp"].astype(float)
-            ex_ra_y = np.cos(np.radians(dec0)) * (ex_coords.ra.deg - np.median(coords.ra.deg)) * 3600
-            ex_ra_y_err = ex_coords_rms.ra.arcsec
-            ex_dec_y = (ex_coords.dec.deg  - np.median(coords.dec.deg)) * 3600
-            ex_dec_y_err = ex_coords_rms.dec.arcsec
-
-        dec_y = (coords.dec.deg  - np.median(coords.dec.deg)) * 3600
-        dec_y_err = coords_rms.dec.arcsec
-
-        plot_x_extrapolate = np.append([0.0], x)
-
-        output_row["ra"] = ra0
-        output_row["dec"] = dec0
-        output_row["rmsRA"] = ra0_err
-        output_row["rmsDec"] = dec0_err
-        # Ensure notes has no whitespace (remove spaces, tabs, newlines)
-        raw_notes = str(output_row.get("notes", ""))
-        cleaned_notes = "".join(raw_notes.split())
-        output_row["notes"] = "e" + cleaned_notes
-
-        try:
-            base_cols = [c for c in group.columns if c != "_row_id"]
-            aligned = output_row.copy()
-            aligned["ra"] = ra0
-            aligned["dec"] = dec0
-            aligned["rmsRA"] = ra0_err
-            aligned["rmsDec"] = dec0_err
-            row_dict: dict[str, Any] = {}
-            for col in base_cols:
-                value = aligned[col] if col in aligned else None
-                if isinstance(value, float) and np.isnan(value):
-                    value = None
-                elif hasattr(value, "item"):
-                    value = value.item()
-                row_dict[col] = value
-            prelim = session.get("prelim_derived_by_obstime") or {}
-            prelim[str(obs_time)] = row_dict
-            session["prelim_derived_by_obstime"] = prelim
+        x = group_fit["photAp"].to_numpy(dtype=float)
+        # Plain float64 arrays: RA/Dec in degrees, rms in arcseconds
+        ra_deg = unwrap_ra(group_fit["ra"].to_numpy(dtype=float))
+        dec_deg = group_fit["dec"].to_numpy(dtype=float)
+        rms_ra_arcsec = group_fit["rmsRA"].to_numpy(dtype=float)
+        rms_dec_arcsec = group_fit["rmsDec"].to_numpy(dtype=float)
+
+        ra_fit, dec_fit = fit_radec_lines(x, ra_deg, dec_deg, rms_ra_arcsec, rms_dec_arcsec)
+        ra0, ra0_err = round_ra_zero_aperture(np.polyval(ra_fit, 0.0), float(output_row["rmsRA"]))
+        dec0, dec0_err = round_zero_aperture(np.polyval(dec_fit, 0.0), float(output_row["rmsDec"]))
+    except Exception:  # pragma: no cover - degenerate group
+        return None
+
+    ra_ref = float(np.median(ra_deg))
+    dec_ref = float(np.median(dec_deg))
+    cos_dec = float(np.cos(np.radians(dec0)))
+    fit: dict[str, Any] = {
+        "obs_time": str(output_row.get("obsTime", "Selected group")),
+        "row_ids": _row_ids(group_fit),
+        "picked_id": str(output_row["_row_id"]) if "_row_id" in output_row else None,
+        "ra0": ra0,
+        "dec0": dec0,
+        "ra0_err": ra0_err,
+        "dec0_err": dec0_err,
+        "ra_fit": ra_fit,
+        "dec_fit": dec_fit,
+        "ra_ref": ra_ref,
+        "dec_ref": dec_ref,
+        "x": x,
+        "ra_y": cos_dec * delta_ra_deg(ra_deg, ra_ref) * ARCSEC_PER_DEG,
+        "ra_y_err": rms_ra_arcsec,
+        "dec_y": (dec_deg - dec_ref) * ARCSEC_PER_DEG,
+        "dec_y_err": rms_dec_arcsec,
+        "excluded": None,
+    }
+    if excluded_subset is not None and not excluded_subset.empty:
+        fit["excluded"] = {
+            "row_ids": _row_ids(excluded_subset),
+            "x": excluded_subset["photAp"].to_numpy(dtype=float),
+            "ra_y": cos_dec * delta_ra_deg(excluded_subset["ra"], ra_ref) * ARCSEC_PER_DEG,
+            "ra_y_err": excluded_subset["rmsRA"].to_numpy(dtype=float),
+            "dec_y": (excluded_subset["dec"].to_numpy(dtype=float) - dec_ref) * ARCSEC_PER_DEG,
+            "dec_y_err": excluded_subset["rmsDec"].to_numpy(dtype=float),
+        }
+    base_cols = [c for c in group.columns if c != "_row_id"]
+    fit["derived_row"] = build_derived_row(output_row, base_cols, ra0, dec0, ra0_err, dec0_err)
+    return fit
+
+
+def fit_obstime_group(
+    df: pd.DataFrame,
+    obstime: str,
+    excluded_ids: Iterable[str],
+    picked_id: Optional[str],
+    groups: Optional[ObsTimeIndex] = None,
+) -> Optional[dict[str, Any]]:
+    """``prepare_group_fit`` for one obsTime of a parsed file."""
+    selected_df, included_df = split_obstime_group(df, obstime, excluded_ids, groups)
+    output_row = find_output_row(selected_df, included_df, picked_id)
+    return prepare_group_fit(included_df, output_row=output_row, full_group=selected_df)
+
+
+def group_fit_payload(fit: dict[str, Any]) -> dict[str, Any]:
+    """JSON-ready points, fitted lines and zero-aperture extrapolation of a fit.
+
+    Offsets are in arcseconds from the group's median position, exactly as
+    ``render_group_plot`` draws them (RA point offsets include cos(Dec)).
+    """
+    line_x = np.append([0.0], fit["x"])
+    excluded = fit["excluded"]
+
+    def _axis(name: str, ref: float, coeffs: np.ndarray, zero: float, zero_err: float) -> dict[str, Any]:
+        line = (np.polyval(coeffs, line_x) - ref) * ARCSEC_PER_DEG
+        zero_offset = (
+            delta_ra_deg(np.polyval(coeffs, 0.0), ref) if name == "ra" else np.polyval(coeffs, 0.0) - ref
+        ) * ARCSEC_PER_DEG
+        return {
+            "zero_aperture": zero,
+            "zero_aperture_err": zero_err,
+            "reference_deg": ref,
+            "fit": {"slope_deg": float(coeffs[0]), "intercept_deg": float(coeffs[1])},
+            "extrapolation": {"photAp": 0.0, "offset": float(zero_offset), "err": zero_err},
+            "line": {"photAp": line_x.tolist(), "offset": line.tolist()},
+            "included": {
+                "row_id": fit["row_ids"],
+                "photAp": fit["x"].tolist(),
+                "offset": fit[f"{name}_y"].tolist(),
+                "err": fit[f"{name}_y_err"].tolist(),
+            },
+            "excluded": {
+                "row_id": excluded["row_ids"] if excluded else [],
+                "photAp": excluded["x"].tolist() if excluded else [],
+                "offset": excluded[f"{name}_y"].tolist() if excluded else [],
+                "err": excluded[f"{name}_y_err"].tolist() if excluded else [],
+            },
+        }
+
+    return {
+        "obsTime": fit["obs_time"],
+        "picked_id": fit["picked_id"],
+        "ra": _axis("ra", fit["ra_ref"], fit["ra_fit"], fit["ra0"], fit["ra0_err"]),
+        "dec": _axis("dec", fit["dec_ref"], fit["dec_fit"], fit["dec0"], fit["dec0_err"]),
+    }
+
+
+def stage_group_fit(fit: dict[str, Any]) -> None:
+    """Remember the fit's derived row and picked row in the session."""
+    try:
+        prelim = session.get("prelim_derived_by_obstime") or {}
+        prelim[fit["obs_time"]] = fit["derived_row"]
+        session["prelim_derived_by_obstime"] = prelim
+        if fit["picked_id"] is not None:
             picked = session.get("picked_by_obstime") or {}
-            if "_row_id" in output_row:
-                picked[str(obs_time)] = str(output_row["_row_id"])
-                session["picked_by_obstime"] = picked
-        except Exception:  # pragma: no cover - fail silently for session persistence
-            pass
-
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(8, 6), sharey=True)
-        fig.suptitle(f"{obs_time} – Linear Fit")
-        ax1.set_title(f"RA: ${ra0}^\\circ$")
-        ax1.errorbar(0, (np.polyval(ra_fit, 0)  - np.median(coords.ra.deg)) * 3600, ra0_ploterr, label="0 Aperture Extrapolation", fmt="o")
-        if ex_x is not None and ex_ra_y is not None and ex_ra_y_err is not None:
-            ax1.errorbar(ex_x, ex_ra_y, ex_ra_y_err, label="Excluded RA data", fmt="s", c="r")
-        ax1.errorbar(x, ra_y, ra_y_err, label="Included RA data", fmt="d", c="k", mew=3, zorder=10)
-        ax1.plot(x, (np.polyval(ra_fit, x)  - np.median(coords.ra.deg)) * 3600, label="RA fit", color="k")
-        ax1.plot(plot_x_extrapolate, (np.polyval(ra_fit, plot_x_extrapolate)  - np.median(coords.ra.deg)) * 3600, color="black", ls="--")
-        ax1.set_ylabel(r"$\Delta$RA*cos(Dec) (arcseconds)")
-        ax1.legend(loc=(1.1, 0.35))
-
-        ax2.set_title(f"Dec: ${dec0}^\\circ$")
-        ax2.errorbar(0, (np.polyval(dec_fit, 0)  - np.median(coords.dec.deg)) * 3600, dec0_ploterr, label="0 Aperture Extrapolation", fmt="o")
-        if ex_x is not None and ex_dec_y is not None and ex_dec_y_err is not None:
-            ax2.errorbar(ex_x, ex_dec_y, ex_dec_y_err, label="Excluded Dec data", fmt="s", c="r")
-        ax2.errorbar(x, dec_y, dec_y_err, label="Included Dec data", fmt="s", c="k", mew=3, zorder=10)
-        ax2.plot(x, (np.polyval(dec_fit, x)  - np.median(coords.dec.deg)) * 3600, label="Dec fit", color="black")
-        ax2.plot(plot_x_extrapolate, (np.polyval(dec_fit, plot_x_extrapolate)  - np.median(coords.dec.deg)) * 3600, color="black", ls="--")
-        ax2.set_xlabel("Photometric Aperture (photAp)")
-        ax2.set_ylabel(r"$\Delta$Dec (arcseconds)")
-        ax2.legend(loc=(1.1, 0.35))
-        buf = io.BytesIO()
-        plt.tight_layout()
-        fig.savefig(buf, format="png")
-        plt.close(fig)
-        buf.seek(0)
-        b64 = base64.b64encode(buf.getvalue()).decode("ascii").strip()
-        urls["coords_photAp"] = f"data:image/png;base64,{b64}"
-    except Exception:  # pragma: no cover - plotting best effort
-        return urls
-
-    return urls
+            picked[fit["obs_time"]] = fit["picked_id"]
+            session["picked_by_obstime"] = picked
+    except Exception:  # pragma: no cover - fail silently for session persistence
+        pass
+
+
+def _new_figure(**kwargs: Any) -> Any:
+    """A standalone Agg figure, outside pyplot's global figure manager.
+
+    Each call owns its Figure and canvas, so renders can run concurrently in
+    worker threads. Labels are plain unicode rather than mathtext, whose shared
+    parser is not thread-safe. matplotlib is imported on first use; most
+    requests never draw a plot.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def render_group_plot(fit: dict[str, Any]) -> bytes:
+    """Render the combined RA/Dec vs photAp plot of a prepared fit as PNG bytes."""
+    x = fit["x"]
+    ra_fit, dec_fit = fit["ra_fit"], fit["dec_fit"]
+    ra_ref, dec_ref = fit["ra_ref"], fit["dec_ref"]
+    excluded = fit["excluded"]
+    plot_x_extrapolate = np.append([0.0], x)
+
+    fig = _new_figure(figsize=(8, 6))
+    ax1, ax2 = fig.subplots(2, 1, sharey=True)
+    fig.suptitle(f"{fit['obs_time']} – Linear Fit")
+    ax1.set_title(f"RA: {fit['ra0']}\N{DEGREE SIGN}")
+    ax1.errorbar(0, delta_ra_deg(np.polyval(ra_fit, 0), ra_ref) * ARCSEC_PER_DEG, fit["ra0_err"], label="0 Aperture Extrapolation", fmt="o")
+    if excluded is not None:
+        ax1.errorbar(excluded["x"], excluded["ra_y"], excluded["ra_y_err"], label="Excluded RA data", fmt="s", c="r")
+    ax1.errorbar(x, fit["ra_y"], fit["ra_y_err"], label="Included RA data", fmt="d", c="k", mew=3, zorder=10)
+    ax1.plot(x, (np.polyval(ra_fit, x) - ra_ref) * ARCSEC_PER_DEG, label="RA fit", color="k")
+    ax1.plot(plot_x_extrapolate, (np.polyval(ra_fit, plot_x_extrapolate) - ra_ref) * ARCSEC_PER_DEG, color="black", ls="--")
+    ax1.set_ylabel("\N{GREEK CAPITAL LETTER DELTA}RA*cos(Dec) (arcseconds)")
+    ax1.legend(loc=(1.1, 0.35))
+
+    ax2.set_title(f"Dec: {fit['dec0']}\N{DEGREE SIGN}")
+    ax2.errorbar(0, (np.polyval(dec_fit, 0) - dec_ref) * ARCSEC_PER_DEG, fit["dec0_err"], label="0 Aperture Extrapolation", fmt="o")
+    if excluded is not None:
+        ax2.errorbar(excluded["x"], excluded["dec_y"], excluded["dec_y_err"], label="Excluded Dec data", fmt="s", c="r")
+    ax2.errorbar(x, fit["dec_y"], fit["dec_y_err"], label="Included Dec data", fmt="s", c="k", mew=3, zorder=10)
+    ax2.plot(x, (np.polyval(dec_fit, x) - dec_ref) * ARCSEC_PER_DEG, label="Dec fit", color="black")
+    ax2.plot(plot_x_extrapolate, (np.polyval(dec_fit, plot_x_extrapolate) - dec_ref) * ARCSEC_PER_DEG, color="black", ls="--")
+    ax2.set_xlabel("Photometric Aperture (photAp)")
+    ax2.set_ylabel("\N{GREEK CAPITAL LETTER DELTA}Dec (arcseconds)")
+    ax2.legend(loc=(1.1, 0.35))
+    buf = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
 
 
 def compute_linear_fits(group: pd.DataFrame) -> Optional[dict[str, dict[str, float]]]:
-    """Compute linear fits for RA vs photAp and Dec vs photAp on given DataFrame."""
-    group_orig = group.dropna(subset=["photAp", "ra", "dec", "rmsRA", "rmsDec"]).copy()
-    coords = SkyCoord(ra=group["ra"], dec=group["dec"], unit=u.deg, frame="icrs")
-    coords_rms = SkyCoord(ra=group["rmsRA"], dec=group["rmsDec"], unit=u.arcsec, frame="icrs")
-    output_row = group.iloc[0]
+    """Compute linear fits for RA vs photAp and Dec vs photAp on given DataFrame.
 
+    The first row supplies the rms used to size the errors, as for a pick.
+    """
+    group = group.dropna(subset=FIT_COLUMNS)
     if group.empty or len(group) < 2:
         return None
 
     try:
-        x = group["photAp"].astype(float)
-        np.polyfit(x, coords.ra.deg, 1, w=1 / coords_rms.ra.deg, cov="unscaled")
-        np.polyfit(x, coords.dec.deg, 1, w=1 / coords_rms.dec.deg, cov="unscaled")
-        raerr_sigfigs = np.abs(np.floor(np.log10(output_row["rmsRA"].astype(float) * 2))) + 1
-        ra0_err = round(output_row["rmsRA"].astype(float) * 2, int(raerr_sigfigs.iloc[0]))
-        ra_sig_figs = np.abs(np.floor(np.log10(ra0_err / 3600))) + 1
-        ra0 = round(np.polyval(np.polyfit(x, coords.ra.deg, 1), 0), int(ra_sig_figs.iloc[0]))
-        decerr_sigfigs = np.abs(np.floor(np.log10(output_row["rmsDec"].astype(float) * 2))) + 1
-        dec0_err = round(output_row["rmsDec"].astype(float) * 2, int(decerr_sigfigs.iloc[0]))
-        dec_sig_figs = np.abs(np.floor(np.log10(dec0_err / 3600))) + 1
-        dec0 = round(np.polyval(np.polyfit(x, coords.dec.deg, 1), 0), int(dec_sig_figs.iloc[0]))
+        ra_fit, dec_fit = fit_radec_lines(
+            group["photAp"].to_numpy(dtype=float),
+            unwrap_ra(group["ra"].to_numpy(dtype=float)),
+            group["dec"].to_numpy(dtype=float),
+            group["rmsRA"].to_numpy(dtype=float),
+            group["rmsDec"].to_numpy(dtype=float),
+        )
+        output_row = group.iloc[0]
+        ra0, ra0_err = round_ra_zero_aperture(np.polyval(ra_fit, 0.0), float(output_row["rmsRA"]))
+        dec0, dec0_err = round_zero_aperture(np.polyval(dec_fit, 0.0), float(output_row["rmsDec"]))
     except Exception:
         return None
 
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+PREVIEW_PAGE_SIZE = 50
+PREVIEW_MAX_LIMIT = 1000
+# Whole-file sort permutations kept per worker, keyed by (file, column, direction)
+SORT_ORDERS_MAX = 16
+
+_sort_orders: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+_sort_orders_lock = threading.Lock()
+
+
+def _argsort(values: pd.Series, ascending: bool) -> np.ndarray:
+    """Stable order of ``values`` by position, missing values last either way."""
+    ordered = values.reset_index(drop=True).sort_values(ascending=ascending, kind="stable", na_position="last")
+    return ordered.index.to_numpy()
+
+
+def sorted_positions(
+    df: pd.DataFrame,
+    column: str,
+    ascending: bool = True,
+    positions: Optional[np.ndarray] = None,
+    cache_key: Optional[Hashable] = None,
+) -> np.ndarray:
+    """Row positions of ``df`` (or of ``positions``) ordered by ``column``.
+
+    Sorting a subset costs its own size. The whole-file permutation is
+    computed once per ``cache_key`` and reused, so paging through a sorted
+    file stays proportional to the page.
+    """
+    if positions is not None:
+        return positions[_argsort(df[column].iloc[positions], ascending)]
+    key = None if cache_key is None else (cache_key, column, ascending)
+    if key is not None:
+        with _sort_orders_lock:
+            order = _sort_orders.get(key)
+            if order is not None:
+                _sort_orders.move_to_end(key)
+                return order
+    order = _argsort(df[column], ascending)
+    if key is not None:
+        with _sort_orders_lock:
+            _sort_orders[key] = order
+            while len(_sort_orders) > SORT_ORDERS_MAX:
+                _sort_orders.popitem(last=False)
+    return order
+
+
+def preview_page(
+    df: pd.DataFrame,
+    positions: Optional[np.ndarray] = None,
+    columns: Optional[Sequence[str]] = None,
+    sort: Optional[str] = None,
+    ascending: bool = True,
+    offset: int = 0,
+    limit: int = PREVIEW_PAGE_SIZE,
+    cache_key: Optional[Hashable] = None,
+) -> dict[str, Any]:
+    """One JSON-ready page of ``df`` restricted to ``positions``.
+
+    Only the requested ``columns`` of the ``limit`` rows on the page are
+    converted. Raises KeyError for unknown columns.
+    """
+    names = [c for c in df.columns if c != "_row_id"]
+    if columns:
+        unknown = [c for c in columns if c not in names]
+        if unknown:
+            raise KeyError(f"Unknown column(s): {', '.join(unknown)}")
+        names = list(columns)
+    if sort is not None and sort not in df.columns:
+        raise KeyError(f"Unknown sort column: {sort}")
+
+    total = len(df) if positions is None else len(positions)
+    offset = max(0, min(offset, total))
+    limit = max(0, min(limit, PREVIEW_MAX_LIMIT))
+    if sort is not None:
+        page_pos = sorted_positions(df, sort, ascending, positions, cache_key)[offset : offset + limit]
+    elif positions is not None:
+        page_pos = positions[offset : offset + limit]
+    else:
+        page_pos = np.arange(offset, min(offset + limit, total))
+
+    page = df.iloc[page_pos][names].astype(object)
+    page = page.where(page.notna(), None)
+    return {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "columns": names,
+        "row_ids": page.index.astype(str).tolist(),
+        "rows": page.to_numpy().tolist(),
+    }
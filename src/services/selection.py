@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import itertools
 import re
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable, Optional
 
 import pandas as pd
 
+if TYPE_CHECKING:
+    from .obstime_index import ObsTimeIndex
+
 
 def parse_row_indices(raw: str, max_length: int) -> list[int]:
     """Parse comma separated indices/ranges like '0,2,5-8'."""
@@ -43,3 +46,32 @@ def apply_selection_modifiers(df: pd.DataFrame, modifiers: Iterable[dict]) -> pd
             if isinstance(n, int) and n >= 0:
                 result = result.head(n)
     return result
+
+
+def split_obstime_group(
+    df: pd.DataFrame, obstime: str, excluded_ids: Iterable[str], groups: Optional[ObsTimeIndex] = None
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Return (whole group, included rows) for ``obstime``, tagged with ``_row_id``.
+
+    With the frame's ``groups`` index the rows are taken by position instead
+    of scanning and stringifying the whole obsTime column.
+    """
+    if groups is not None:
+        selected_df = df.iloc[groups.positions(obstime)].copy()
+    else:
+        selected_df = df[df["obsTime"].astype(str) == str(obstime)].copy()
+    selected_df["_row_id"] = selected_df.index.astype(str)
+    excluded = {str(i) for i in excluded_ids or []}
+    return selected_df, selected_df[~selected_df["_row_id"].isin(excluded)].copy()
+
+
+def find_output_row(
+    selected_df: pd.DataFrame, included_df: pd.DataFrame, picked_id: Optional[str]
+) -> Optional[pd.Series]:
+    """Locate the picked row, preferring the included rows over excluded ones."""
+    if not picked_id:
+        return None
+    sel_row = included_df[included_df["_row_id"] == str(picked_id)]
+    if sel_row.empty:
+        sel_row = selected_df[selected_df["_row_id"] == str(picked_id)]
+    return sel_row.iloc[0] if not sel_row.empty else None
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+from flask import Flask
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+SESSION_BACKENDS = ("cookie", "filesystem", "sqlite")
+SESSION_DIR_NAME = "sessions"  # under UPLOAD_FOLDER unless SESSION_STORE_DIR is set
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+# Expired records are swept at most this often per worker
+PURGE_INTERVAL_SECONDS = 10 * 60
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict whose contents live in a ``SessionStore``; the cookie holds only ``sid``."""
+
+    def __init__(self, initial: Optional[dict[str, Any]] = None, sid: str = "", new: bool = False) -> None:
+        def on_update(self: ServerSideSession) -> None:
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.accessed = False
+
+
+class SessionStore(ABC):
+    """Persistence for session payloads keyed by session id, with expiry."""
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS) -> None:
+        self.ttl_seconds = int(ttl_seconds)
+        self._last_purge = 0.0
+
+    @abstractmethod
+    def load(self, sid: str) -> Optional[tuple[dict[str, Any], float]]:
+        """Return (data, expires_at) or None when missing or expired."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, sid: str, data: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, sid: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Drop expired sessions; returns how many were removed."""
+        raise NotImplementedError
+
+    def maybe_purge(self) -> None:
+        now = time.time()
+        if now - self._last_purge >= PURGE_INTERVAL_SECONDS:
+            self._last_purge = now
+            self.purge_expired()
+
+
+class FilesystemSessionStore(SessionStore):
+    """One JSON file per session; writes are atomic renames, so workers never see partial state."""
+
+    def __init__(self, directory: str, ttl_seconds: int = DEFAULT_TTL_SECONDS) -> None:
+        super().__init__(ttl_seconds)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid: str) -> str:
+        return os.path.join(self.directory, f"{sid}.json")
+
+    def load(self, sid: str) -> Optional[tuple[dict[str, Any], float]]:
+        path = self._path(sid)
+        try:
+            expires_at = os.stat(path).st_mtime + self.ttl_seconds
+            if expires_at < time.time():
+                self.delete(sid)
+                return None
+            with open(path, "r", encoding="utf-8") as handle:
+                return self.serializer.loads(handle.read()), expires_at
+        except (OSError, ValueError):
+            return None
+
+    def save(self, sid: str, data: dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                handle.write(self.serializer.dumps(data))
+            os.replace(tmp_path, self._path(sid))
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, sid: str) -> None:
+        try:
+            os.unlink(self._path(sid))
+        except FileNotFoundError:
+            pass
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in one SQLite database (WAL mode) shared by every worker."""
+
+    def __init__(self, path: str, ttl_seconds: int = DEFAULT_TTL_SECONDS) -> None:
+        super().__init__(ttl_seconds)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections are per thread and per process (gunicorn forks after import)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, sid: str) -> Optional[tuple[dict[str, Any], float]]:
+        row = self._connect().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at >= ?", (sid, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return self.serializer.loads(row[0]), row[1]
+        except ValueError:
+            return None
+
+    def save(self, sid: str, data: dict[str, Any]) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+            (sid, self.serializer.dumps(data), time.time() + self.ttl_seconds),
+        )
+
+    def delete(self, sid: str) -> None:
+        self._connect().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def purge_expired(self) -> int:
+        return self._connect().execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),)).rowcount
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keep session state in ``store``; the cookie carries only a signed session id.
+
+    Unmodified sessions are not rewritten unless less than half of their TTL
+    remains, so read-only requests cost one lookup and no write.
+    """
+
+    session_class = ServerSideSession
+    salt = "server-side-session"
+
+    def __init__(self, store: SessionStore) -> None:
+        self.store = store
+
+    def _signer(self, app: Flask) -> Optional[Signer]:
+        if not app.secret_key:
+            return None
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app: Flask, request: Any) -> Optional[ServerSideSession]:
+        signer = self._signer(app)
+        if signer is None:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = signer.unsign(cookie).decode("ascii")
+            except BadSignature:
+                sid = None
+            if sid:
+                stored = self.store.load(sid)
+                if stored is not None:
+                    data, expires_at = stored
+                    session = self.session_class(data, sid=sid)
+                    session.expires_at = expires_at
+                    return session
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app: Flask, session: ServerSideSession, response: Any) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if not session.new:
+                self.store.delete(session.sid)
+            if session.modified or not session.new:
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        stale = time.time() > getattr(session, "expires_at", 0) - self.store.ttl_seconds / 2
+        if session.modified or session.new or stale:
+            self.store.save(session.sid, dict(session))
+        self.store.maybe_purge()
+        if not (session.new or stale or self.should_set_cookie(app, session)):
+            return
+        signer = self._signer(app)
+        response.set_cookie(
+            name,
+            signer.sign(session.sid).decode("ascii"),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def build_session_interface(app: Flask) -> Optional[ServerSideSessionInterface]:
+    """Session interface for ``app.config["SESSION_BACKEND"]``; None keeps Flask's cookie session."""
+    backend = app.config.get("SESSION_BACKEND", "sqlite")
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+    if backend == "cookie":
+        return None
+    directory = app.config.get("SESSION_STORE_DIR") or os.path.join(app.config["UPLOAD_FOLDER"], SESSION_DIR_NAME)
+    ttl = int(app.config.get("SESSION_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+    if backend == "filesystem":
+        return ServerSideSessionInterface(FilesystemSessionStore(directory, ttl))
+    return ServerSideSessionInterface(SQLiteSessionStore(os.path.join(directory, "sessions.sqlite3"), ttl))
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+SIDECAR_SUFFIX = ".cols"
+MANIFEST_NAME = "manifest.json"
+# Bump whenever the readers' output changes: stale sidecars and download spools are then rebuilt
+FORMAT_VERSION = 2
+
+
+def sidecar_path(filepath: str) -> str:
+    """Directory holding the columnar copy of ``filepath``."""
+    return f"{filepath}{SIDECAR_SUFFIX}"
+
+
+def _source_stamp(filepath: str) -> dict[str, int]:
+    stats = os.stat(filepath)
+    return {"size": stats.st_size, "mtime_ns": stats.st_mtime_ns}
+
+
+def write_sidecar(filepath: str, df: pd.DataFrame) -> None:
+    """Write ``df`` next to ``filepath`` as one ``.npy`` file per column.
+
+    Numeric columns are stored as-is; text columns become fixed-width unicode
+    arrays plus a missing-value mask, so every file can be memory-mapped. The
+    directory is assembled under a temporary name and renamed into place.
+    """
+    target = sidecar_path(filepath)
+    parent = os.path.dirname(os.path.abspath(target))
+    tmp_dir = tempfile.mkdtemp(prefix=".sidecar-", dir=parent)
+    try:
+        columns = []
+        for i, name in enumerate(df.columns):
+            col = df[name]
+            entry = {"name": name, "file": f"c{i}.npy"}
+            if is_numeric_dtype(col.dtype) or is_bool_dtype(col.dtype):
+                entry["kind"] = "numeric"
+                np.save(os.path.join(tmp_dir, entry["file"]), col.to_numpy())
+            else:
+                entry["kind"] = "text"
+                missing = col.isna().to_numpy()
+                text = col.astype(object).where(~missing, "").astype(str).to_numpy(dtype=str)
+                np.save(os.path.join(tmp_dir, entry["file"]), text)
+                if missing.any():
+                    entry["mask"] = f"m{i}.npy"
+                    np.save(os.path.join(tmp_dir, entry["mask"]), missing)
+            columns.append(entry)
+        np.save(os.path.join(tmp_dir, "index.npy"), df.index.to_numpy())
+        manifest = {
+            "version": FORMAT_VERSION,
+            "source": _source_stamp(filepath),
+            "columns": columns,
+            "attrs": df.attrs,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp_dir, target)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def load_sidecar(filepath: str) -> Optional[pd.DataFrame]:
+    """Return the frame stored for ``filepath`` or None if missing/stale/unreadable.
+
+    Numeric columns stay memory-mapped; text columns are copied into object
+    arrays (pandas needs Python strings), so they cost memory like a fresh
+    parse but skip the text parsing. A sidecar that is half-written,
+    replaced mid-read or evicted yields None, and the caller re-parses.
+    """
+    target = sidecar_path(filepath)
+    try:
+        with open(os.path.join(target, MANIFEST_NAME), "r", encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        if manifest.get("version") != FORMAT_VERSION or manifest.get("source") != _source_stamp(filepath):
+            return None
+
+        data = {}
+        for entry in manifest["columns"]:
+            values = np.load(os.path.join(target, entry["file"]), mmap_mode="r")
+            if entry["kind"] == "text":
+                values = values.astype(object)
+                if "mask" in entry:
+                    values[np.load(os.path.join(target, entry["mask"]))] = None
+            data[entry["name"]] = values
+        index = np.load(os.path.join(target, "index.npy"))
+    except (OSError, ValueError, KeyError):
+        return None
+    df = pd.DataFrame(data, index=index, copy=False)
+    df.attrs.update(manifest.get("attrs") or {})
+    return df
@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from flask import Flask, session
+
+from .export_store import EXPORTS_DIR_NAME
+from .metrics import METRICS_DIR_NAME, registry
+from .session_store import SESSION_DIR_NAME
+from .sidecar import SIDECAR_SUFFIX
+from .upload_store import OBJECTS_DIR_NAME, REFS_SUFFIX, evict_object, prune_references
+
+PLOTS_DIR_NAME = "plots"
+DERIVED_PREFIX = "derived_"
+LOCK_NAME = ".storage.lock"
+# Usage found by the last sweep, shared by all workers for /metrics
+STATE_NAME = ".storage.json"
+# Last-access stamps are refreshed at most this often per path and worker
+TOUCH_INTERVAL_SECONDS = 60.0
+# Temporary files of interrupted writes are removed once this old
+PARTIAL_MAX_AGE_SECONDS = 60 * 60
+# Eviction stops at this fraction of the quota so a full store is not swept on every write
+LOW_WATER = 0.9
+KINDS = ("upload", "derived", "export", "plot", "other")
+
+logger = logging.getLogger(__name__)
+
+evictions = registry.counter("zaac_storage_evictions_total", "Stored items evicted or expired")
+evicted_bytes = registry.counter("zaac_storage_evicted_bytes_total", "Bytes freed by eviction and expiry")
+
+
+def _tree_size(path: str) -> int:
+    try:
+        if not os.path.isdir(path):
+            return os.path.getsize(path)
+    except OSError:
+        return 0
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _is_partial(name: str) -> bool:
+    return name.endswith((".part", ".tmp"))
+
+
+@dataclass
+class StoredItem:
+    """Files that live and die together: an upload with its sidecar and references, a derived store, a spool."""
+
+    kind: str
+    paths: list[str]
+    nbytes: int
+    last_access: float
+    live: bool = False
+
+
+class StorageManager:
+    """Keeps ``UPLOAD_FOLDER`` under a byte quota.
+
+    Every stored item has a last-access time: upload references and derived
+    store locks are touched while their session is active, spools and plots
+    when they are served. An upload referenced by a session active within
+    ``live_seconds``, or such a session's derived store, is live and never
+    evicted. With cookie sessions nothing on the server knows when a session
+    has expired, so derived stores are always live. Sweeps drop what can no longer be reached (references and
+    derived stores of expired sessions, stale temporary files). When the
+    store is over quota, the least recently used of the remaining items are
+    evicted down to ``LOW_WATER`` of it. Each worker sweeps from a
+    background thread every ``sweep_interval`` seconds, or sooner once
+    enough has been written. A file lock keeps two workers from sweeping at
+    the same time.
+    """
+
+    def __init__(self) -> None:
+        self.root: Optional[str] = None
+        self.quota_bytes = 0
+        self.live_seconds = 24 * 60 * 60
+        self.sweep_interval = 300.0
+        self.server_sessions = True
+        self._touched: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._pending_bytes = 0
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid = 0
+
+    def configure(
+        self, root: str, quota_bytes: int, live_seconds: int, sweep_interval: float, server_sessions: bool = True
+    ) -> None:
+        self.root = root
+        self.quota_bytes = int(quota_bytes)
+        self.live_seconds = int(live_seconds)
+        self.sweep_interval = float(sweep_interval)
+        self.server_sessions = bool(server_sessions)
+
+    # -- access tracking -------------------------------------------------
+
+    def touch(self, path: Optional[str]) -> None:
+        """Record an access to ``path`` (throttled; missing files are ignored)."""
+        if not path:
+            return
+        now = time.time()
+        with self._lock:
+            if now - self._touched.get(path, 0.0) < TOUCH_INTERVAL_SECONDS:
+                return
+            if len(self._touched) > 4096:
+                self._touched.clear()
+            self._touched[path] = now
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def touch_session(self) -> None:
+        """Mark the current session's uploads and derived store as in use."""
+        if not self.root:
+            return
+        from .workspace import workspace_paths
+
+        owner = session.get("upload_owner")
+        if owner:
+            for path in workspace_paths() | {session.get("last_file_path")}:
+                if path:
+                    self.touch(os.path.join(f"{path}{REFS_SUFFIX}", owner))
+        token = session.get("derived_token")
+        if token:
+            # The lock file, not the log: the log's mtime keys the parsed-log cache
+            self.touch(os.path.join(self.root, f"{DERIVED_PREFIX}{token}.jsonl.lock"))
+
+    def note_write(self, nbytes: int) -> None:
+        """Account for bytes just written; wakes the sweeper once they could matter for the quota."""
+        with self._lock:
+            self._pending_bytes += int(nbytes)
+            due = self.quota_bytes > 0 and self._pending_bytes > self.quota_bytes * (1.0 - LOW_WATER)
+        if due:
+            self._wake.set()
+
+    # -- sweeping --------------------------------------------------------
+
+    def scan(self, now: Optional[float] = None) -> tuple[list[StoredItem], list[StoredItem]]:
+        """(items, garbage) under the root; garbage is unreachable and removed regardless of quota."""
+        now = time.time() if now is None else now
+        live_after = now - self.live_seconds
+        items: list[StoredItem] = []
+        garbage: list[StoredItem] = []
+        if not self.root or not os.path.isdir(self.root):
+            return items, garbage
+
+        derived: dict[str, list[str]] = {}
+        for entry in os.scandir(self.root):
+            name = entry.name
+            if name in (LOCK_NAME, STATE_NAME, SESSION_DIR_NAME, METRICS_DIR_NAME):
+                # Sessions expire themselves; metrics snapshots are rewritten in place
+                continue
+            if name == OBJECTS_DIR_NAME and entry.is_dir():
+                self._scan_objects(entry.path, now, live_after, items, garbage)
+            elif name in (EXPORTS_DIR_NAME, PLOTS_DIR_NAME) and entry.is_dir():
+                self._scan_cache_dir(entry.path, "export" if name == EXPORTS_DIR_NAME else "plot", now, items, garbage)
+            elif name.startswith(DERIVED_PREFIX) and ".jsonl" in name:
+                derived.setdefault(name.split(".jsonl", 1)[0], []).append(entry.path)
+            elif _is_partial(name):
+                if now - _mtime(entry.path) > PARTIAL_MAX_AGE_SECONDS:
+                    garbage.append(StoredItem("other", [entry.path], _tree_size(entry.path), _mtime(entry.path)))
+            else:
+                items.append(StoredItem("other", [entry.path], _tree_size(entry.path), _mtime(entry.path)))
+
+        for paths in derived.values():
+            last = max(_mtime(p) for p in paths)
+            # Cookie sessions never expire server-side, so their stores may be reached any time
+            live = last >= live_after or not self.server_sessions
+            item = StoredItem("derived", paths, sum(_tree_size(p) for p in paths), last, live=live)
+            # Nobody can reach the derived store of an expired session
+            (items if item.live else garbage).append(item)
+        return items, garbage
+
+    def _scan_objects(
+        self, directory: str, now: float, live_after: float, items: list[StoredItem], garbage: list[StoredItem]
+    ) -> None:
+        for entry in os.scandir(directory):
+            name = entry.name
+            if name == ".lock" or name.endswith((SIDECAR_SUFFIX, REFS_SUFFIX)):
+                continue
+            if _is_partial(name):
+                if now - _mtime(entry.path) > PARTIAL_MAX_AGE_SECONDS:
+                    garbage.append(StoredItem("upload", [entry.path], _tree_size(entry.path), _mtime(entry.path)))
+                continue
+            refs_dir = f"{entry.path}{REFS_SUFFIX}"
+            sidecar = f"{entry.path}{SIDECAR_SUFFIX}"
+            try:
+                ref_times = [_mtime(ref.path) for ref in os.scandir(refs_dir)]
+            except (FileNotFoundError, NotADirectoryError):  # never referenced, or released meanwhile
+                ref_times = []
+            last = max([_mtime(entry.path), _mtime(refs_dir), *ref_times])
+            nbytes = _tree_size(entry.path) + _tree_size(sidecar)
+            live = any(stamp >= live_after for stamp in ref_times)
+            items.append(StoredItem("upload", [entry.path, sidecar, refs_dir], nbytes, last, live=live))
+        # A sidecar whose upload is gone is never read again
+        for entry in os.scandir(directory):
+            if entry.name.endswith(SIDECAR_SUFFIX) and not os.path.exists(entry.path[: -len(SIDECAR_SUFFIX)]):
+                garbage.append(StoredItem("upload", [entry.path], _tree_size(entry.path), _mtime(entry.path)))
+
+    def _scan_cache_dir(
+        self, directory: str, kind: str, now: float, items: list[StoredItem], garbage: list[StoredItem]
+    ) -> None:
+        groups: dict[str, list[str]] = {}
+        for entry in os.scandir(directory):
+            if _is_partial(entry.name):
+                if now - _mtime(entry.path) > PARTIAL_MAX_AGE_SECONDS:
+                    garbage.append(StoredItem(kind, [entry.path], _tree_size(entry.path), _mtime(entry.path)))
+                continue
+            # A spool and its size file share a key
+            groups.setdefault(entry.name.split(".", 1)[0], []).append(entry.path)
+        for paths in groups.values():
+            items.append(StoredItem(kind, paths, sum(_tree_size(p) for p in paths), max(_mtime(p) for p in paths)))
+
+    def _evict(self, item: StoredItem) -> bool:
+        if item.kind == "upload" and len(item.paths) == 3:
+            return evict_object(item.paths[0])
+        for path in item.paths:
+            _remove(path)
+        return True
+
+    def sweep(self) -> Optional[dict[str, Any]]:
+        """Expire garbage and enforce the quota; None when another worker is sweeping."""
+        if not self.root:
+            return None
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, LOCK_NAME), "a") as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            try:
+                return self._sweep_locked()
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _sweep_locked(self) -> dict[str, Any]:
+        with self._lock:
+            self._pending_bytes = 0
+        assert self.root is not None
+        objects = os.path.join(self.root, OBJECTS_DIR_NAME)
+        if os.path.isdir(objects):
+            # References of expired sessions; their uploads become evictable
+            prune_references(objects, time.time() - self.live_seconds)
+        items, garbage = self.scan()
+        for item in garbage:
+            if self._evict(item):
+                evictions.inc(kind=item.kind, reason="expired")
+                evicted_bytes.inc(item.nbytes, kind=item.kind, reason="expired")
+
+        total = sum(item.nbytes for item in items)
+        kept = items
+        if self.quota_bytes > 0 and total > self.quota_bytes:
+            target = self.quota_bytes * LOW_WATER
+            evicted: set[int] = set()
+            for item in sorted((i for i in items if not i.live), key=lambda i: i.last_access):
+                if total <= target:
+                    break
+                if self._evict(item):
+                    evicted.add(id(item))
+                    total -= item.nbytes
+                    evictions.inc(kind=item.kind, reason="quota")
+                    evicted_bytes.inc(item.nbytes, kind=item.kind, reason="quota")
+            kept = [item for item in items if id(item) not in evicted]
+            if total > self.quota_bytes:
+                logger.warning("Storage over quota: %d of %d bytes held by live sessions", total, self.quota_bytes)
+
+        usage = {kind: {"bytes": 0, "items": 0, "live_bytes": 0} for kind in KINDS}
+        for item in kept:
+            usage[item.kind]["bytes"] += item.nbytes
+            usage[item.kind]["items"] += 1
+            if item.live:
+                usage[item.kind]["live_bytes"] += item.nbytes
+        state = {"time": time.time(), "quota_bytes": self.quota_bytes, "usage": usage}
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            json.dump(state, out)
+        os.replace(tmp_path, os.path.join(self.root, STATE_NAME))
+        return state
+
+    def usage(self) -> Optional[dict[str, Any]]:
+        """Usage recorded by the most recent sweep of any worker."""
+        if not self.root:
+            return None
+        try:
+            with open(os.path.join(self.root, STATE_NAME), "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def start(self) -> None:
+        """Run the sweeper in this process (once per worker, after any fork)."""
+        if not self.root or (self._thread_pid == os.getpid() and self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._thread_pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="storage-sweeper", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sweep()
+            except Exception:  # pragma: no cover - keep sweeping after transient disk errors
+                logger.exception("Storage sweep failed")
+            self._wake.wait(self.sweep_interval)
+            self._wake.clear()
+
+
+storage_manager = StorageManager()
+
+
+def _storage_collector() -> dict[str, tuple[str, str, list[tuple[dict[str, str], float]]]]:
+    state = storage_manager.usage()
+    if state is None:
+        return {}
+    usage = state["usage"]
+    return {
+        "zaac_storage_bytes": (
+            "gauge",
+            "Bytes stored under UPLOAD_FOLDER",
+            [({"kind": k}, v["bytes"]) for k, v in usage.items()],
+        ),
+        "zaac_storage_items": ("gauge", "Stored items", [({"kind": k}, v["items"]) for k, v in usage.items()]),
+        "zaac_storage_live_bytes": (
+            "gauge",
+            "Bytes held by live sessions (never evicted)",
+            [({"kind": k}, v["live_bytes"]) for k, v in usage.items()],
+        ),
+        "zaac_storage_quota_bytes": ("gauge", "Storage quota (0 = unlimited)", [({}, state["quota_bytes"])]),
+        "zaac_storage_last_sweep_timestamp_seconds": ("gauge", "Time of the last storage sweep", [({}, state["time"])]),
+    }
+
+
+registry.register_shared_collector(_storage_collector)
+
+
+def init_storage(app: Flask) -> None:
+    """Manage ``UPLOAD_FOLDER`` within ``STORAGE_QUOTA_BYTES`` and track session activity."""
+    storage_manager.configure(
+        app.config["UPLOAD_FOLDER"],
+        app.config["STORAGE_QUOTA_BYTES"],
+        app.config["SESSION_TTL_SECONDS"],
+        app.config["STORAGE_SWEEP_SECONDS"],
+        server_sessions=app.config.get("SESSION_BACKEND", "sqlite") != "cookie",
+    )
+
+    @app.before_request
+    def _track_storage() -> None:
+        storage_manager.start()
+        storage_manager.touch_session()
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+from flask import current_app, session
+
+from .sidecar import sidecar_path
+
+OBJECTS_DIR_NAME = "objects"
+REFS_SUFFIX = ".refs"
+CHUNK_SIZE = 1024 * 1024
+
+
+def objects_dir() -> str:
+    return os.path.join(current_app.config["UPLOAD_FOLDER"], OBJECTS_DIR_NAME)
+
+
+def _session_owner() -> str:
+    owner = session.get("upload_owner")
+    if not owner:
+        owner = uuid.uuid4().hex
+        session["upload_owner"] = owner
+    return owner
+
+
+@contextmanager
+def _locked(directory: str) -> Iterator[None]:
+    """Serialise reference changes across workers so objects are not removed while being claimed."""
+    with open(os.path.join(directory, ".lock"), "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _refs_dir(object_path: str) -> str:
+    return f"{object_path}{REFS_SUFFIX}"
+
+
+def store_upload(stream: BinaryIO, ext: str) -> tuple[str, str]:
+    """Stream an upload into the object store and claim it for this session.
+
+    The bytes are hashed while they are written to a temporary file, which is
+    renamed to ``objects/<sha256>.<ext>`` unless that object already exists.
+    Identical uploads therefore share one path, and with it the parsed frame,
+    sidecar and rendered plots. Returns (object path, hex digest).
+    """
+    directory = objects_dir()
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                handle.write(chunk)
+        sha = digest.hexdigest()
+        object_path = os.path.join(directory, f"{sha}.{ext.lower()}")
+        with _locked(directory):
+            if os.path.exists(object_path):
+                os.unlink(tmp_path)
+            else:
+                os.replace(tmp_path, object_path)
+            _claim(object_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    from .storage import storage_manager
+
+    storage_manager.note_write(os.path.getsize(object_path))
+    return object_path, sha
+
+
+def _claim(object_path: str) -> None:
+    refs = _refs_dir(object_path)
+    os.makedirs(refs, exist_ok=True)
+    ref = os.path.join(refs, _session_owner())
+    with open(ref, "a"):
+        pass
+    # The ref's mtime marks when the session last claimed the object
+    os.utime(ref)
+
+
+def release_upload(object_path: Optional[str]) -> None:
+    """Drop this session's reference; the last reference removes the object and its sidecar."""
+    owner = session.get("upload_owner")
+    if not object_path or not owner or os.path.dirname(object_path) != objects_dir():
+        return
+    with _locked(objects_dir()):
+        refs = _refs_dir(object_path)
+        try:
+            os.unlink(os.path.join(refs, owner))
+        except FileNotFoundError:
+            pass
+        try:
+            if os.listdir(refs):
+                return
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(refs, ignore_errors=True)
+        shutil.rmtree(sidecar_path(object_path), ignore_errors=True)
+        try:
+            os.unlink(object_path)
+        except FileNotFoundError:
+            pass
+
+
+def reference_count(object_path: str) -> int:
+    try:
+        return len(os.listdir(_refs_dir(object_path)))
+    except FileNotFoundError:
+        return 0
+
+
+def prune_references(directory: str, older_than: float) -> int:
+    """Drop references last touched before ``older_than`` (sessions that expired); returns how many."""
+    pruned = 0
+    with _locked(directory):
+        for refs in os.scandir(directory):
+            if not refs.name.endswith(REFS_SUFFIX) or not refs.is_dir():
+                continue
+            try:
+                entries = list(os.scandir(refs.path))
+            except FileNotFoundError:
+                continue
+            for ref in entries:
+                try:
+                    if ref.stat().st_mtime < older_than:
+                        os.unlink(ref.path)
+                        pruned += 1
+                except FileNotFoundError:
+                    pass
+    return pruned
+
+
+def evict_object(object_path: str) -> bool:
+    """Remove an upload, its sidecar and reference directory unless a session still references it."""
+    with _locked(os.path.dirname(object_path)):
+        refs = _refs_dir(object_path)
+        try:
+            if os.listdir(refs):
+                return False
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(refs, ignore_errors=True)
+        shutil.rmtree(sidecar_path(object_path), ignore_errors=True)
+        try:
+            os.unlink(object_path)
+        except FileNotFoundError:
+            pass
+    return True
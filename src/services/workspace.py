@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Optional
+
+from flask import Flask, current_app, session
+
+from .file_io import obstime_index, read_file_to_dataframe
+
+# Session keys that belong to the active file; they are stashed per file when another one is activated
+FILE_STATE_KEYS = (
+    "selected_obstime",
+    "selected_indices",
+    "excluded_by_obstime",
+    "picked_by_obstime",
+    "prelim_derived_by_obstime",
+    "available_obstimes",
+    "obstime_counts",
+    "original_columns",
+)
+
+
+def _parse_one(app: Flask, filepath: str, filename: str) -> dict[str, Any]:
+    # Pool threads do not inherit the request's app context, which the sidecar needs
+    with app.app_context():
+        df = read_file_to_dataframe(filepath, filename)
+        groups = obstime_index(filepath, df)
+    return {
+        "rows": len(df),
+        "available_obstimes": list(groups.keys),
+        "obstime_counts": dict(groups.counts),
+        "original_columns": [c for c in df.columns if c != "_row_id"],
+    }
+
+
+def parse_uploads(uploads: list[tuple[str, str]], max_workers: int) -> list[dict[str, Any]]:
+    """Parse stored uploads concurrently, one result per upload in input order.
+
+    Each file is read (filling the frame cache, sidecar and obsTime index)
+    on a bounded thread pool, so a batch takes about as long as its largest
+    file when the parsers release the GIL. A file that fails gets an
+    ``error`` entry instead of aborting the others.
+    """
+    if not uploads:
+        return []
+    results: list[dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(uploads)))) as pool:
+        app = current_app._get_current_object()
+        futures = [pool.submit(_parse_one, app, path, name) for path, name in uploads]
+        for (path, name), future in zip(uploads, futures):
+            entry = {"key": os.path.basename(path), "path": path, "filename": name}
+            try:
+                entry.update(future.result())
+            except Exception as exc:
+                entry["error"] = str(exc)
+            results.append(entry)
+    return results
+
+
+def workspace_files() -> list[dict[str, Any]]:
+    """Files of the session's workspace, in upload order."""
+    files = session.get("workspace_files")
+    if files:
+        return files
+    # Sessions from before workspaces hold a single file
+    path, name = session.get("last_file_path"), session.get("last_filename")
+    if not path or not name:
+        return []
+    return [
+        {
+            "key": os.path.basename(path),
+            "path": path,
+            "filename": name,
+            "available_obstimes": session.get("available_obstimes") or [],
+            "obstime_counts": session.get("obstime_counts") or {},
+        }
+    ]
+
+
+def workspace_paths() -> set[str]:
+    return {entry["path"] for entry in workspace_files()}
+
+
+def _stash_active() -> dict[str, dict[str, Any]]:
+    states = session.get("workspace_state") or {}
+    path = session.get("last_file_path")
+    if path:
+        states[os.path.basename(path)] = {key: session.get(key) for key in FILE_STATE_KEYS if key in session}
+    return states
+
+
+def activate_file(key: str) -> Optional[dict[str, Any]]:
+    """Make the workspace file ``key`` the one every handler works on.
+
+    The per-file session state (group, exclusions, picks, staged entries)
+    of the previous file is kept, so a group is effectively keyed by
+    (file, obsTime). Returns the file's entry, or None if it is not loaded.
+    """
+    entry = next((f for f in workspace_files() if f["key"] == key), None)
+    if entry is None:
+        return None
+    if session.get("last_file_path") == entry["path"]:
+        return entry
+    states = _stash_active()
+    for state_key in FILE_STATE_KEYS:
+        session.pop(state_key, None)
+    session.update(states.pop(key, {}))
+    session["workspace_state"] = states
+    session["last_file_path"] = entry["path"]
+    session["last_filename"] = entry["filename"]
+    session["saved_filename"] = os.path.basename(entry["path"])
+    if "available_obstimes" not in session:
+        session["available_obstimes"] = entry.get("available_obstimes") or []
+        session["obstime_counts"] = entry.get("obstime_counts") or {}
+        session["original_columns"] = entry.get("original_columns")
+    return entry
+
+
+def replace_workspace(files: Iterable[dict[str, Any]]) -> list[str]:
+    """Load ``files`` (parse results without errors) as the workspace and activate the first.
+
+    Files that were already in the workspace keep their state. Returns the
+    paths that dropped out, for the caller to release.
+    """
+    files = list(files)
+    previous = workspace_paths()
+    states = _stash_active()
+    keep = {f["key"] for f in files}
+    session["workspace_state"] = {key: state for key, state in states.items() if key in keep}
+    session["workspace_files"] = files
+    for state_key in FILE_STATE_KEYS:
+        session.pop(state_key, None)
+    session.pop("last_file_path", None)
+    if files:
+        activate_file(files[0]["key"])
+    return sorted(previous - {f["path"] for f in files})
+
+
+def file_state(entry: dict[str, Any]) -> dict[str, Any]:
+    """Per-file session state of workspace file ``entry``.
+
+    The active file's state lives in the session itself; the others are
+    read from their stash. Pass changes back through ``save_file_state``.
+    """
+    if session.get("last_file_path") == entry["path"]:
+        return {key: session.get(key) for key in FILE_STATE_KEYS if key in session}
+    return dict((session.get("workspace_state") or {}).get(entry["key"]) or {})
+
+
+def save_file_state(entry: dict[str, Any], **values: Any) -> None:
+    """Store per-file state keys for ``entry``, active or stashed."""
+    if session.get("last_file_path") == entry["path"]:
+        session.update(values)
+        return
+    states = session.get("workspace_state") or {}
+    states[entry["key"]] = {**(states.get(entry["key"]) or {}), **values}
+    session["workspace_state"] = states
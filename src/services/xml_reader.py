@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+INITIAL_CAPACITY = 1024
+# Observation record types allowed inside an ADES obsData element
+RECORD_TAGS = ("optical", "offset", "occultation")
+
+
+class _ColumnBuffers:
+    """Growable per-column object buffers filled one observation at a time."""
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY) -> None:
+        self.capacity = capacity
+        self.length = 0
+        self.columns: dict[str, np.ndarray] = {}
+
+    def _grow(self) -> None:
+        self.capacity *= 2
+        for name, buf in self.columns.items():
+            grown = np.empty(self.capacity, dtype=object)
+            grown[: self.length] = buf[: self.length]
+            self.columns[name] = grown
+
+    def append(self, record: dict[str, Any]) -> None:
+        if self.length == self.capacity:
+            self._grow()
+        for name, value in record.items():
+            buf = self.columns.get(name)
+            if buf is None:
+                # np.empty(dtype=object) is None-filled, so earlier rows read as missing
+                buf = self.columns[name] = np.empty(self.capacity, dtype=object)
+            buf[self.length] = value
+        self.length += 1
+
+    def to_frame(self) -> pd.DataFrame:
+        data = {}
+        for name, buf in self.columns.items():
+            values = pd.Series(buf[: self.length], dtype=object)
+            numeric = pd.to_numeric(values, errors="coerce")
+            # Keep the column numeric only if every present value parsed
+            data[name] = numeric if numeric.isna().sum() == values.isna().sum() else values
+        return pd.DataFrame(data)
+
+
+def _localname(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def read_ades_xml(filepath: str) -> pd.DataFrame:
+    """Stream ADES XML observations into a DataFrame with ``lxml.etree.iterparse``.
+
+    Every ``optical``/``offset``/``occultation`` record becomes one row (its
+    attributes and child element texts become columns). Records are cleared as
+    soon as they are read, so memory tracks the output frame rather than the
+    document.
+
+    ``obsContext`` metadata is kept on ``df.attrs["obs_blocks"]`` as one entry
+    per ``obsBlock`` holding the serialized context and the ``[start, stop)``
+    index labels of its observations.
+    """
+    buffers = _ColumnBuffers()
+    blocks: list[dict[str, Any]] = []
+    block: dict[str, Any] = {}
+    version = None
+
+    context = etree.iterparse(
+        filepath,
+        events=("start", "end"),
+        tag=[f"{{*}}{name}" for name in ("ades", "obsBlock", "obsContext", *RECORD_TAGS)],
+        resolve_entities=False,
+        no_network=True,
+        remove_comments=True,
+    )
+    for event, elem in context:
+        tag = _localname(elem.tag)
+        if event == "start":
+            if tag == "ades":
+                version = elem.get("version")
+            elif tag == "obsBlock":
+                block = {"obs_context": None, "start": buffers.length, "stop": buffers.length}
+            continue
+
+        if tag in RECORD_TAGS:
+            record: dict[str, Any] = dict(elem.attrib)
+            for child in elem:
+                if isinstance(child.tag, str):
+                    text = child.text.strip() if child.text else None
+                    record[_localname(child.tag)] = text or None
+            buffers.append(record)
+        elif tag == "obsContext":
+            block["obs_context"] = etree.tostring(elem, encoding="unicode").strip()
+        elif tag == "obsBlock":
+            block["stop"] = buffers.length
+            blocks.append(block)
+        else:
+            continue
+        elem.clear()
+        # Drop already-processed siblings so the tree never accumulates
+        parent = elem.getparent()
+        while parent is not None and elem.getprevious() is not None:
+            del parent[0]
+    del context
+
+    df = buffers.to_frame()
+    df.attrs["ades_version"] = version
+    df.attrs["obs_blocks"] = blocks
+    return df
@@ -0,0 +1,73 @@
+"""Aligned PSV streaming and the derived-row log's read cache.
+
+``legacy_format_psv_aligned`` is the cell-by-cell formatter that
+``iter_psv_aligned`` replaced; the streamed text must match it byte for byte.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+from src.services import derived_store
+from src.services.file_io import read_file_to_dataframe
+
+EXAMPLES = Path(__file__).resolve().parent.parent / "example_files"
+
+
+def legacy_format_psv_aligned(df: pd.DataFrame) -> str:
+    if df is None or df.empty:
+        return ""
+    str_df = df.map(lambda v: "" if pd.isna(v) else str(v))
+    widths = []
+    for col in str_df.columns:
+        widths.append(max(len(str(col)), int(str_df[col].str.len().max() or 0)))
+    header = "|".join(str(col).ljust(widths[i]) for i, col in enumerate(str_df.columns))
+    lines = [header]
+    for _, row in str_df.iterrows():
+        lines.append("|".join(str(row.iloc[i]).ljust(widths[i]) for i in range(len(widths))))
+    return "\n".join(lines) + "\n"
+
+
+def _example_frame(name: str) -> pd.DataFrame:
+    df = read_file_to_dataframe(str(EXAMPLES / name), name, cache=False)
+    df = df.copy()
+    # Padded text and missing values in text and numeric columns
+    text = next(col for col in df.columns if not pd.api.types.is_numeric_dtype(df[col]))
+    df.loc[df.index[::3], text] = "  padded  "
+    df.loc[df.index[1::4], text] = None
+    numeric = df.select_dtypes("number").columns
+    if len(numeric):
+        df.loc[df.index[::5], numeric[0]] = np.nan
+    # Mixed object cells, as rebuilt from the JSON rows of the derived log
+    counts = [None if i % 7 == 0 else i * 1.5 if i % 2 else i for i in range(len(df))]
+    df["count"] = pd.Series(counts, dtype=object, index=df.index)
+    return df
+
+
+@pytest.mark.parametrize("name", ["test.psv", "test.xml"])
+@pytest.mark.parametrize("chunk_rows", [1, 3, derived_store.PSV_CHUNK_ROWS])
+def test_iter_psv_aligned_matches_legacy_formatter(name, chunk_rows):
+    df = _example_frame(name)
+    streamed = "".join(derived_store.iter_psv_aligned(df, chunk_rows=chunk_rows))
+    assert streamed == legacy_format_psv_aligned(df)
+
+
+def test_iter_psv_aligned_of_empty_frame():
+    assert derived_store.format_psv_aligned(pd.DataFrame()) == legacy_format_psv_aligned(pd.DataFrame())
+
+
+def test_loaded_rows_are_copies_of_the_cache(tmp_path):
+    app = Flask(__name__)
+    app.config.update(UPLOAD_FOLDER=str(tmp_path), SECRET_KEY="test")
+    with app.test_request_context():
+        derived_store.append_derived_rows([{"ra": 1.0}], ["<obsContext/>"])
+        rows, contexts = derived_store.load_derived_rows_with_contexts()
+        rows[0]["ra"] = 2.0
+        derived_store.load_derived_entries()[0][1]["ra"] = 3.0
+        assert derived_store.load_derived_rows() == [{"ra": 1.0}]
+        assert contexts == ["<obsContext/>"]
@@ -0,0 +1,163 @@
+"""Parity of the float64 fit with the SkyCoord implementation it replaced.
+
+Golden values were produced by the previous ``generate_group_plots`` code
+(astropy ``SkyCoord`` coordinates, ``np.polyfit`` with 1/sigma weights and
+the inline significant-figure rounding).
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from src.services.fitting import build_derived_rows, fit_all_groups, round_ra_zero_aperture, round_zero_aperture
+from src.services.plotting import prepare_group_fit
+
+APERTURES = [2.0, 3.0, 4.0, 5.0, 6.0]
+
+# name: (columns, picked position, (ra0, ra0_err, dec0, dec0_err))
+GROUPS = {
+    "plain": (
+        {
+            "photAp": APERTURES,
+            "ra": [150.123412, 150.123431, 150.123449, 150.123470, 150.123488],
+            "dec": [12.345611, 12.345622, 12.345630, 12.345644, 12.345652],
+            "rmsRA": [0.12, 0.10, 0.09, 0.11, 0.15],
+            "rmsDec": [0.11, 0.09, 0.08, 0.10, 0.14],
+        },
+        2,
+        (150.123373, 0.18, 12.34559, 0.16),
+    ),
+    # The old code cannot fit across RA 0/360, so its golden comes from the
+    # same points rotated 10 deg east (9.999745) and rotated back
+    "ra_wrap": (
+        {
+            "photAp": APERTURES,
+            "ra": [359.999871, 359.999934, 359.999996, 0.000061, 0.000122],
+            "dec": [1.234501, 1.234512, 1.234524, 1.234533, 1.234547],
+            "rmsRA": [0.12, 0.10, 0.09, 0.11, 0.15],
+            "rmsDec": [0.11, 0.09, 0.08, 0.10, 0.14],
+        },
+        2,
+        (359.999745, 0.18, 1.234479, 0.16),
+    ),
+    "high_dec": (
+        {
+            "photAp": APERTURES,
+            "ra": [283.410012, 283.410311, 283.410598, 283.410902, 283.411187],
+            "dec": [-86.731204, -86.731188, -86.731175, -86.731159, -86.731146],
+            "rmsRA": [0.21, 0.18, 0.17, 0.19, 0.25],
+            "rmsDec": [0.20, 0.17, 0.16, 0.18, 0.24],
+        },
+        1,
+        (283.40942, 0.36, -86.731232, 0.34),
+    ),
+    "two_point": (
+        {
+            "photAp": [3.0, 5.0],
+            "ra": [45.678901, 45.678955],
+            "dec": [-5.432101, -5.432077],
+            "rmsRA": [0.3, 0.35],
+            "rmsDec": [0.28, 0.33],
+        },
+        0,
+        (45.67882, 0.6, -5.43214, 0.56),
+    ),
+}
+
+
+def _group(name: str) -> tuple[pd.DataFrame, int, tuple[float, float, float, float]]:
+    columns, picked, expected = GROUPS[name]
+    group = pd.DataFrame({"obsTime": f"2024-05-01T00:00:0{list(GROUPS).index(name)}Z", **columns})
+    return group, picked, expected
+
+
+@pytest.mark.parametrize("name", list(GROUPS))
+def test_prepare_group_fit_matches_skycoord(name):
+    group, picked, expected = _group(name)
+    fit = prepare_group_fit(group, output_row=group.iloc[picked].copy())
+    assert (fit["ra0"], fit["ra0_err"], fit["dec0"], fit["dec0_err"]) == expected
+
+
+@pytest.mark.parametrize("name", list(GROUPS))
+def test_fit_all_groups_matches_prepare_group_fit(name):
+    group, picked, _ = _group(name)
+    fit = prepare_group_fit(group, output_row=group.iloc[picked].copy())
+    fits = fit_all_groups(group, picked_by_obstime={group["obsTime"][0]: str(picked)})
+    assert len(fits) == 1
+    row = fits.iloc[0]
+    assert (row["ra0"], row["ra0_err"], row["dec0"], row["dec0_err"]) == (
+        fit["ra0"],
+        fit["ra0_err"],
+        fit["dec0"],
+        fit["dec0_err"],
+    )
+
+
+def test_fit_all_groups_matches_prepare_group_fit_in_one_frame():
+    frames = [_group(name)[0] for name in GROUPS]
+    df = pd.concat(frames, ignore_index=True)
+    offsets = [0, *pd.Series([len(f) for f in frames]).cumsum()[:-1]]
+    picks = {
+        frame["obsTime"][0]: str(offset + GROUPS[name][1]) for name, frame, offset in zip(GROUPS, frames, offsets)
+    }
+    fits = fit_all_groups(df, picked_by_obstime=picks).set_index("obsTime")
+    for name, frame in zip(GROUPS, frames):
+        expected = GROUPS[name][2]
+        row = fits.loc[frame["obsTime"][0]]
+        assert (row["ra0"], row["ra0_err"], row["dec0"], row["dec0_err"]) == expected
+
+
+@pytest.mark.parametrize(
+    "intercept, rms, expected",
+    [
+        (150.1234567, 0.049, (150.123457, 0.098)),
+        # 2 * rms lands on the next decade
+        (150.1234567, 0.05, (150.123457, 0.1)),
+        (-12.34567891, 0.26, (-12.34568, 0.52)),
+        # A vanishing rms is clamped rather than taking log10(0)
+        (10.5, 1e-15, (10.5, 0.0)),
+        (89.99999, 12.0, (90.0, 24.0)),
+        (0.000123456, 0.0049, (0.0001235, 0.0098)),
+    ],
+)
+def test_round_zero_aperture(intercept, rms, expected):
+    assert round_zero_aperture(intercept, rms) == expected
+
+
+@pytest.mark.parametrize(
+    "intercept, rms, expected",
+    [
+        # Rounds up to 360 and must come out as 0
+        (359.99999996, 0.1, (0.0, 0.2)),
+        (-0.00000004, 0.1, (0.0, 0.2)),
+        (359.999745, 0.09, (359.999745, 0.18)),
+        (360.0001234, 0.0049, (0.0001234, 0.0098)),
+    ],
+)
+def test_round_ra_zero_aperture_folds_after_rounding(intercept, rms, expected):
+    assert round_ra_zero_aperture(intercept, rms) == expected
+
+
+def test_fit_all_groups_orders_groups_by_parsed_time():
+    # By text "...:03.5Z" sorts before "...:03Z"; by time it comes after
+    columns = GROUPS["two_point"][0]
+    times = ["2024-05-01T01:02:03.5Z", "2024-05-01T01:02:03Z", "2024-05-01T01:02:04Z"]
+    df = pd.concat([pd.DataFrame({"obsTime": t, **columns}) for t in times], ignore_index=True)
+    fits = fit_all_groups(df, picked_by_obstime={t: str(2 * i) for i, t in enumerate(times)})
+    assert fits["obsTime"].tolist() == [times[1], times[0], times[2]]
+
+
+def test_fit_all_groups_with_repeated_row_ids():
+    # Frames concatenated without a new index repeat the labels 0..4 in every group
+    frames = [_group(name)[0].assign(tag=name) for name in ("plain", "high_dec", "ra_wrap")]
+    df = pd.concat(frames)
+    assert not df.index.is_unique
+    picks = {frame["obsTime"][0]: str(GROUPS[name][1]) for name, frame in zip(("plain", "high_dec", "ra_wrap"), frames)}
+    fits = fit_all_groups(df, picked_by_obstime=picks)
+    assert len(fits) == 3
+    rows = build_derived_rows(df, fits)
+    for fit, row in zip(fits.itertuples(), rows):
+        name = row["tag"]
+        assert row["obsTime"] == fit.obsTime
+        assert (row["ra"], row["rmsRA"], row["dec"], row["rmsDec"]) == GROUPS[name][2]
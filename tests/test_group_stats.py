@@ -0,0 +1,57 @@
+"""Incremental exclusion fits against the grouped fit they shortcut."""
+
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from src.services.fitting import fit_all_groups
+from src.services.group_stats import build_group_stats
+
+OBSTIME = "2024-05-01T00:00:00Z"
+COLUMNS = {
+    "obsTime": OBSTIME,
+    "photAp": [2.0, 3.0, 4.0, 5.0, 6.0],
+    "ra": [150.123412, 150.123431, 150.123449, 150.123470, 150.123488],
+    "dec": [12.345611, 12.345622, 12.345630, 12.345644, 12.345652],
+    "rmsRA": [0.12, 0.10, 0.0, 0.11, 0.15],
+    "rmsDec": [0.11, 0.09, 0.08, 0.10, float("inf")],
+}
+KEYS = ("ra_intercept", "ra_intercept_err", "dec_intercept", "dec_intercept_err", "ra0", "ra0_err", "dec0", "dec0_err")
+
+
+def _expected(df: pd.DataFrame, excluded: list[str], picked: str) -> dict:
+    fits = fit_all_groups(df, excluded_by_obstime={OBSTIME: excluded}, picked_by_obstime={OBSTIME: picked})
+    return {key: fits.iloc[0][key] for key in KEYS}
+
+
+@pytest.mark.parametrize(
+    "excluded",
+    [
+        [],
+        # Each bad rms excluded in turn: that coordinate is weighted again
+        ["2"],
+        ["4"],
+        ["2", "4"],
+        ["0", "2", "4"],
+    ],
+)
+def test_fit_matches_fit_all_groups(excluded):
+    df = pd.DataFrame(COLUMNS)
+    stats = build_group_stats(df)
+    fit = stats.fit(excluded, "1")
+    expected = _expected(df, excluded, "1")
+    for key in KEYS:
+        assert fit[key] == pytest.approx(expected[key], rel=1e-12, abs=1e-12), key
+
+
+def test_toggling_rows_matches_fit_all_groups():
+    df = pd.DataFrame(COLUMNS)
+    stats = build_group_stats(df)
+    excluded: list[str] = []
+    for row_id in ["2", "4", "2", "0", "4", "0"]:
+        excluded = [i for i in excluded if i != row_id] if row_id in excluded else [*excluded, row_id]
+        fit = stats.fit(excluded, "1")
+        expected = _expected(df, excluded, "1")
+        for key in KEYS:
+            assert fit[key] == pytest.approx(expected[key], rel=1e-12, abs=1e-12), (excluded, key)
@@ -0,0 +1,103 @@
+"""Parsed dtypes and values of the C-engine ADES PSV reader.
+
+Expected values are those of the previous python-engine reader with the
+field padding stripped. Intended differences: a blank cell is missing
+rather than padding, and ``mag`` is numeric even with a blank cell.
+"""
+
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from src.services.derived_store import format_psv_aligned
+from src.services.export_store import iter_tsv
+from src.services.psv_reader import read_ades_psv
+
+HEADER = (
+    "permID |provID     |trkSub  |mode|stn |obsTime                 |ra         |dec        "
+    "|rmsRA|rmsDec|mag  |band|fltr|photAp|exp |notes|remarks\n"
+)
+ROWS = [
+    "       |2024 AB1   |        | CCD|T05 |2025-06-13T10:53:57.79Z |292.637105 |-19.038822 "
+    "|0.087|0.093 |18.7 |   G|    | 1.8  | 300|K    |\n",
+    "       |2024 AB1   |        | CCD|T05 |2025-06-13T10:53:57.79Z |292.637103 |-19.038823 "
+    "|0.109|0.114 |     |   G|    | 2.6  | 300|     |\n",
+]
+PREAMBLE = "# version=2022\n! observatory\n"
+
+EXPECTED_DTYPES = {
+    "permID": "str",
+    "provID": "str",
+    "trkSub": "str",
+    "mode": "str",
+    "stn": "str",
+    "obsTime": "str",
+    "ra": "float64",
+    "dec": "float64",
+    "rmsRA": "float64",
+    "rmsDec": "float64",
+    "mag": "float64",
+    "band": "str",
+    "fltr": "str",
+    "photAp": "float64",
+    "exp": "int64",
+    "notes": "str",
+    "remarks": "str",
+}
+EXPECTED_VALUES = {
+    # Padded blank columns stay text, as the previous reader kept them
+    "permID": ["", ""],
+    "provID": ["2024 AB1", "2024 AB1"],
+    "trkSub": ["", ""],
+    "mode": ["CCD", "CCD"],
+    "stn": ["T05", "T05"],
+    "obsTime": ["2025-06-13T10:53:57.79Z", "2025-06-13T10:53:57.79Z"],
+    "ra": [292.637105, 292.637103],
+    "dec": [-19.038822, -19.038823],
+    "rmsRA": [0.087, 0.109],
+    "rmsDec": [0.093, 0.114],
+    "mag": [18.7, None],
+    "band": ["G", "G"],
+    "fltr": ["", ""],
+    "photAp": [1.8, 2.6],
+    "exp": [300, 300],
+    "notes": ["K", None],
+    "remarks": ["", ""],
+}
+
+
+def _read(tmp_path, text):
+    path = tmp_path / "obs.psv"
+    path.write_text(text, encoding="utf-8")
+    return read_ades_psv(str(path))
+
+
+def _assert_expected(df):
+    assert {col: str(dtype) for col, dtype in df.dtypes.items()} == EXPECTED_DTYPES
+    for col, expected in EXPECTED_VALUES.items():
+        for value, want in zip(df[col].tolist(), expected):
+            if want is None:
+                assert value is None or (isinstance(value, float) and math.isnan(value)), col
+            else:
+                assert value == want, col
+
+
+def test_read_ades_psv_dtypes_and_values(tmp_path):
+    _assert_expected(_read(tmp_path, PREAMBLE + HEADER + "".join(ROWS)))
+
+
+@pytest.mark.parametrize("extra", [HEADER, "# mid-file comment\n"])
+def test_read_ades_psv_drops_repeated_header_and_comment_rows(tmp_path, extra):
+    df = _read(tmp_path, PREAMBLE + HEADER + ROWS[0] + extra + ROWS[1])
+    assert len(df) == 2
+    _assert_expected(df)
+
+
+def test_outputs_carry_stripped_values(tmp_path):
+    # Compatibility note (README): downloads built from the parsed frame hold
+    # the bare values, where the previous reader kept the source padding
+    df = _read(tmp_path, PREAMBLE + HEADER + "".join(ROWS))[["mode", "stn", "mag", "notes"]]
+    assert format_psv_aligned(df) == "mode|stn|mag |notes\nCCD |T05|18.7|K    \nCCD |T05|    |     \n"
+    assert b"".join(iter_tsv(df)) == b"mode\tstn\tmag\tnotes\nCCD\tT05\t18.7\tK\nCCD\tT05\t\t\n"